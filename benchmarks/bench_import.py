@@ -0,0 +1,47 @@
+"""
+Import time of `wjkim` for a worker that only needs `wj.s`, measured by `python -X importtime`
+
+    python benchmarks/bench_import.py [--limit-ms 50] [--repeat 5]
+
+Exits with 1 if the import takes longer than the limit (over a bare interpreter),
+or if any of the heavy dependencies is imported on the way.
+"""
+import sys
+import argparse
+import subprocess
+
+
+CODE = 'import wjkim; wjkim.s'
+HEAVY = ['numpy', 'matplotlib', 'omegaconf', 'more_itertools']
+
+
+def import_time(code):
+    """(total self time of every import in us, names of the imported modules)"""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                         capture_output=True, text=True, check=True)
+    rows = [line.split('|') for line in out.stderr.splitlines()
+            if line.startswith('import time:') and 'self [us]' not in line]
+    total = sum(int(row[0].rpartition(':')[2]) for row in rows)
+    return total, {row[-1].strip() for row in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--limit-ms', type=float, default=50.)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    bare = min(import_time('pass')[0] for _ in range(args.repeat))
+    results = [import_time(CODE) for _ in range(args.repeat)]
+    elapsed = (min(total for total, _ in results) - bare) / 1000
+    heavy = sorted({name.split('.')[0] for _, modules in results for name in modules} & set(HEAVY))
+
+    print(f'{CODE!r}: {elapsed:.1f} ms (limit {args.limit_ms:.1f} ms)')
+    if heavy:
+        print(f'  Heavy modules imported: {", ".join(heavy)}')
+    if heavy or elapsed > args.limit_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
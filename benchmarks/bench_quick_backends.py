@@ -0,0 +1,61 @@
+"""
+Dump and load times of the serialization backends of Quick on a dict of large NumPy arrays
+
+    python benchmarks/bench_quick_backends.py [--mb 64]
+
+'load' is the time to get the object back, 'load+sum' also reads every array through,
+which is where memory-mapped backends (pickle5, npy) pay for their lazy load.
+"""
+import os
+import argparse
+import tempfile
+from time import perf_counter
+import numpy as np
+from wjkim.experimental import _BACKENDS
+
+
+def data(mb):
+    rng = np.random.default_rng(0)
+    n = mb * 2**20 // 8 // 2
+    return {'weights': np.round(rng.random(n), 3), 'degrees': rng.integers(0, 100, n), 'meta': {'ntype': 'BA'}}
+
+
+def arrays_of(obj):
+    return obj.values() if isinstance(obj, dict) else [obj]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mb', type=int, default=64)
+    parser.add_argument('--backends', nargs='+', default=list(_BACKENDS))
+    args = parser.parse_args()
+
+    obj = data(args.mb)
+    arrays = {key: value for key, value in obj.items() if isinstance(value, np.ndarray)}
+    print(f'{sum(a.nbytes for a in arrays.values()) / 2**20:.0f} MiB of arrays')
+    print(f'{"":>11} {"MiB":>7} {"dump s":>7} {"load s":>7} {"load+sum s":>11}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.backends:
+            load, dump = _BACKENDS[name]
+            target = {'npy': obj['weights'], 'npz': arrays}.get(name, obj)  # What each one can hold
+            path = os.path.join(tmp, f'obj.{name}')
+
+            start = perf_counter()
+            dump(target, path)
+            dumped = perf_counter() - start
+
+            start = perf_counter()
+            res = load(path)
+            loaded = perf_counter() - start
+            for value in arrays_of(res):
+                if isinstance(value, np.ndarray):
+                    value.sum()
+            summed = perf_counter() - start
+
+            size = os.path.getsize(path) / 2**20
+            print(f'{name:>11} {size:>7.0f} {dumped:>7.2f} {loaded:>7.3f} {summed:>11.3f}')
+            del res
+
+
+if __name__ == '__main__':
+    main()
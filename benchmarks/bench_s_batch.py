@@ -0,0 +1,42 @@
+"""
+SubPath.s_many vs. a loop over SubPath.s for 10^6 paths
+
+    python benchmarks/bench_s_batch.py
+"""
+from time import perf_counter
+from itertools import product
+from wjkim.pathlib import SubPath
+
+
+TEMPLATE = '/tmp/wjkim_bench/${ntype}/${ntype}_${cost:.2f}_${trial}.pkl'
+KEYS = ('ntype', 'cost', 'trial')
+GRID = list(product(['BA', 'ER', 'WS', 'SF'], [c/100 for c in range(250)], range(1000)))  # 10^6
+
+
+def loop():
+    sp = SubPath(TEMPLATE)
+    return [sp.s(ntype=ntype, cost=cost, trial=trial) for ntype, cost, trial in GRID]
+
+
+def batch():
+    return SubPath(TEMPLATE).s_many(GRID, keys=KEYS)
+
+
+def batch_str():
+    return SubPath(TEMPLATE).s_many(GRID, keys=KEYS, as_str=True)
+
+
+def batch_dicts():
+    return SubPath(TEMPLATE).s_many([dict(zip(KEYS, row)) for row in GRID])
+
+
+def main():
+    assert loop()[:100] == batch()[:100]
+    for func in [loop, batch, batch_str, batch_dicts]:
+        start = perf_counter()
+        func()
+        print(f'{func.__name__:>12}: {perf_counter() - start:.2f} s for {len(GRID):,} paths')
+
+
+if __name__ == '__main__':
+    main()
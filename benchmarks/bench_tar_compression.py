@@ -0,0 +1,82 @@
+"""
+Throughput vs. compression ratio of wj.tar on a bundle of pickles, per codec and number of workers,
+against the single-threaded stdlib tarfile
+
+    python benchmarks/bench_tar_compression.py [--members 2000] [--workers 1 4]
+"""
+import io
+import os
+import pickle
+import random
+import argparse
+import tempfile
+import tarfile
+from time import perf_counter
+from functools import partial
+from wjkim.tarfile import tar, _zstd
+
+
+def bundle(n_members):
+    """Pickles alike simulation results: int edge lists and rounded float trajectories"""
+    rng = random.Random(0)
+    objs = {}
+    for i in range(n_members):
+        n = rng.randint(100, 2000)
+        edges = [(rng.randrange(n), rng.randrange(n)) for _ in range(2 * n)]
+        trajectory = [round(rng.random(), 3) for _ in range(n)]
+        objs[f'result_{i}.pkl'] = pickle.dumps((edges, trajectory))
+    return objs
+
+
+def stdlib(path, objs, codec):
+    start = perf_counter()
+    with tarfile.open(path, f'w:{codec}') as tf:
+        for name, data in objs.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    written = perf_counter() - start
+    start = perf_counter()
+    with tarfile.open(path, 'r') as tf:
+        for info in tf:
+            tf.extractfile(info).read()
+    return written, perf_counter() - start
+
+
+def wj(path, objs, codec, workers):
+    start = perf_counter()
+    with tar(path, f'w:{codec}', workers=workers) as tf:
+        for name, data in objs.items():
+            tf.add_bytes(name, data)
+    written = perf_counter() - start
+    start = perf_counter()
+    with tar(path, 'r', workers=workers) as tf:
+        for file in tf:
+            file.read()
+    return written, perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--members', type=int, default=2000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count()])
+    args = parser.parse_args()
+
+    objs = bundle(args.members)
+    raw = sum(map(len, objs.values())) / 2**20
+    print(f'{len(objs):,} pickles, {raw:.1f} MiB')
+    print(f'{"":>16} {"ratio":>6} {"write MiB/s":>12} {"read MiB/s":>11}')
+    codecs = ['gz', 'xz'] + (['zst'] if _zstd is not None else [])
+    with tempfile.TemporaryDirectory() as tmp:
+        for codec in codecs:
+            runs = [(f'{codec} stdlib', partial(stdlib, codec=codec))] if codec != 'zst' else []
+            runs += [(f'{codec} workers={w}', partial(wj, codec=codec, workers=w)) for w in args.workers]
+            for label, run in runs:
+                path = os.path.join(tmp, f'bundle.tar.{codec}')
+                written, read = run(path, objs)
+                ratio = raw * 2**20 / os.path.getsize(path)
+                print(f'{label:>16} {ratio:>6.2f} {raw / written:>12.1f} {raw / read:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Quick"""
+from wjkim.experimental import Quick
+from wjkim.pathlib import constants
+
+
+def test_registry_under_override(tmp_path):
+    template = '$rsrc/override/${i}.pkl'
+
+    @Quick(template).register('gen')
+    def gen(i):
+        return i * 2
+
+    with constants.override(rsrc=str(tmp_path)):
+        assert Quick(template).get(i=3) == 6
+        assert (tmp_path / 'override' / '3.pkl').is_file()
+    with constants.override(rsrc=str(tmp_path / 'other')):
+        assert Quick(template).get(i=3) == 6
+        assert (tmp_path / 'other' / 'override' / '3.pkl').is_file()
+
+
+def test_meta_out_of_globs(tmp_path):
+    from wjkim.pathlib import glob, explore, _remap
+    template = f'{tmp_path}/meta/${{ntype}}_${{trial}}.pkl'
+
+    @Quick(template).register('gen')
+    def gen(ntype, trial):
+        return ntype, trial
+
+    Quick(template).get_many([('BA', 0), ('BA', 1), ('ER', 0), ('ER', 1)], keys=['ntype', 'trial'], executor='thread')
+    assert len(list((tmp_path / 'meta').iterdir())) == 4 * 2  # With the stamps
+    assert [p.name for p in glob(f'{tmp_path}/meta/*')] == ['BA_0.pkl', 'BA_1.pkl', 'ER_0.pkl', 'ER_1.pkl']
+    assert explore(f'{tmp_path}/meta/${{name}}')['name'] == ['BA_0.pkl', 'BA_1.pkl', 'ER_0.pkl', 'ER_1.pkl']
+    assert len(_remap(f'{tmp_path}/meta/*', f'{tmp_path}/moved/*')) == 4
+
+
+def test_stale_by_default_argument(tmp_path):
+    template = f'{tmp_path}/default/${{i}}.pkl'
+    calls = []
+
+    @Quick(template).register('gen')
+    def gen(i, n_iter=1000):
+        calls.append(i)
+        return i * n_iter
+
+    assert Quick(template).get(i=1) == 1000
+    assert Quick(template).get(i=1) == 1000 and calls == [1]
+
+    @Quick(template).register('gen')
+    def gen_again(i, n_iter=2000):
+        calls.append(i)
+        return i * n_iter
+
+    assert Quick(template).stale([(1,)], keys=['i'])['stale'] == [dict(i=1)]
+    assert Quick(template).get(i=1) == 2000 and calls == [1, 1]
+
+
+def test_aget_many(tmp_path):
+    import asyncio
+    import threading
+    template = f'{tmp_path}/async/${{i}}.pkl'
+
+    @Quick(template).register('gen')
+    def gen(i):
+        return i * 2
+
+    q = Quick(template).aconfig(executor='thread')
+    assert asyncio.run(q.aget_many([(i,) for i in range(8)], keys=['i'])) == [i * 2 for i in range(8)]
+
+    async def stream():
+        return sorted([res async for _, res in q.aget_many([(i,) for i in range(8, 12)], keys=['i'], stream=True)])
+    assert asyncio.run(stream()) == [16, 18, 20, 22]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(asyncio.run(q.aget(i=20)))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [40] * 4
+
+
+def test_load_baseline_and_corrupted(tmp_path):
+    import pickle
+    template = f'{tmp_path}/backends/${{name}}'
+    calls = []
+
+    @Quick(template).register('gen')
+    def gen(name):
+        calls.append(name)
+        return {'name': name, 'data': list(range(1000))}
+
+    (tmp_path / 'backends').mkdir()
+    with open(tmp_path / 'backends' / 'old.gz', 'wb') as file:  # As Quick dumped any file before the backends
+        pickle.dump('cached', file)
+    assert Quick(template).get(name='old.gz') == 'cached' and calls == []
+
+    for name in ['x.pkl5', 'x.gz', 'x.xz']:
+        expected = Quick(template).get(name=name)
+        path = tmp_path / 'backends' / name
+        data = path.read_bytes()
+        path.write_bytes(data[:len(data) // 2])  # Truncated
+        assert Quick(template).get(name=name) == expected
+        path.write_bytes(data[:20] + bytes(len(data) - 20))  # Corrupted
+        assert Quick(template).get(name=name) == expected
+    assert calls == ['x.pkl5', 'x.pkl5', 'x.pkl5', 'x.gz', 'x.gz', 'x.gz', 'x.xz', 'x.xz', 'x.xz']
+
+
+def test_get_many_memory(tmp_path):
+    import pickle
+    template = f'{tmp_path}/memory/${{i}}.pkl'
+    loads = []
+
+    @Quick(template).register('gen')
+    def gen(i):
+        return [i]
+
+    @Quick(template).register('load')
+    def load(path, **kwargs):
+        loads.append(kwargs['i'])
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+    q = Quick(template).memory(maxsize=16)
+    first = q.get_many([(i,) for i in range(4)], keys=['i'], executor='thread')
+    assert all(q.get(i=i) is first[i] for i in range(4)) and loads == []  # Generated, then kept in memory
+
+    q.memory(maxsize=16)  # Emptied
+    assert q.get(i=0) == [0] and loads == [0]
+    assert q.get_many([(i,) for i in range(2)], keys=['i'], executor='thread')[0] is q.get(i=0)
+    assert sorted(loads) == [0, 1]
@@ -0,0 +1,80 @@
+"""md.convert() against the functions it fuses, applied in turn as MdConvert.convert() used to"""
+import random
+from pathlib import Path
+import pytest
+from wjkim import md
+
+
+IMG_DIR = Path('/tmp/img')
+
+
+def chained(lines, img_dir=IMG_DIR):
+    lines = md.convert_callouts(lines)
+    lines = md.convert_images(lines, img_dir)
+    lines = md.strict_line_break(lines)
+    lines = md.no_empty_lines_in_math_blocks(lines)
+    return md.no_redundant_double_dollars(lines)
+
+
+CASES = {
+    'nested callouts': ['text\n', '> [!note] Title\n', '> inside\n', '> > [!warning] Deeper\n', '> > deep\n',
+                        '> > > deepest\n', '> back\n', 'out\n'],
+    'callout without title': ['> plain quote\n', '> more\n', '\n', 'after\n'],
+    'callout left open': ['> [!tip] Open\n', '> > still open'],
+    'images': ['![[fig.png]]\n', 'text\n', '![[fig.jpg|300]]\n', '> [!note] ![[title.png]]\n', '> ![[in.png|50]]\n',
+               '![[not an image]]\n'],
+    'lists': ['para\n', '- a\n', '  - b\n', '1. one\n', '  2. two\n', '+ c\n', 'para\n', '\n', '- after empty\n'],
+    'headings and rules': ['# H\n', '---\n', 'text\n', '___\n', '## H2\n', '- item\n', '---\n', '\n', '---\n'],
+    'block identifiers': ['para\n', '^block-1\n', 'next\n', '- item\n', '^blk\n', '- item\n', '^\n'],
+    'math parity': ['text\n', '$$\n', 'a = b\n', '\n', '  \n', '- c\n', '$$\n', '\n', 'inline $$x$$ and $$\n',
+                    '\n', '$$\n', '\n'],
+    'equation in $$': ['$$\n', '\\begin{equation}\n', 'a = b\n', '\\end{equation}\n', '$$\n', 'text\n',
+                       '$$ \\begin{align} x \\end{align} $$\n', '$$\\begin{aligned}\n', '\\end{aligned}$$\n'],
+    'equation across blocks': ['$$\n', 'x\n', '$$\n', '$$\\begin{equation}\n', 'y\n', '$$\n', '$$\n',
+                               '\\end{equation}\n', '$$\n'],
+    'other line breaks': ['a\u2028b\n', 'c\x0cd\n', '- x\x1ey\n', 'e\x85\n', 'f\n'],
+    'no final newline': ['# H\n', '- a\n', 'last'],
+    'single line': ['only\n'],
+}
+
+
+@pytest.mark.parametrize('lines', CASES.values(), ids=CASES.keys())
+def test_cases(lines):
+    assert md.convert(lines, IMG_DIR) == chained(lines)
+
+
+PIECES = ['> ', '> > ', '> [!note] T', '> [!WARNING] w', '> > [!tip] x', '- item', '  - sub', '1. one', '  2. two',
+          '# H', '', '   ', '---', '___', '^blk-1', '^', 'text', 'text $$ x', '$$', '$$\\begin{equation}',
+          '\\begin{equation}', '\\end{equation}', '\\end{align}$$', '\\begin{align}', ' $$', '![[a.png]]',
+          '![[b.jpg|300]]', '> ![[c.png]]', 'x\x0cy', 'p\u2028q', '\t', '+ p', '-x', '12.', '\u3000- u', '^ab', '#']
+
+
+def test_random():
+    rng = random.Random(0)
+    for _ in range(2000):
+        lines = [rng.choice(PIECES) + rng.choice(['\n', '\n', ' x\n', '$$\n']) for _ in range(rng.randint(1, 25))]
+        if rng.random() < .3:
+            lines[-1] = lines[-1].rstrip('\n')
+        assert md.convert(lines, IMG_DIR) == chained(lines), lines
+
+
+def test_unknown_callout():
+    lines = ['> [!nonexistent] T\n']
+    with pytest.raises(KeyError):
+        chained(lines)
+    with pytest.raises(KeyError):
+        md.convert(lines, IMG_DIR)
+
+
+def test_empty():
+    """The only difference: the chain fails on strict_line_break()"""
+    with pytest.raises(IndexError):
+        chained([])
+    assert md.convert([], IMG_DIR) == []
+
+
+def test_line_type():
+    expected = {'- a': 'L', '  - a': 'IL', '1. a': 'L', '\t12. a': 'IL', '+ a': 'L', '-a': 'O', '# a': 'H',
+                '  # a': 'O', '': 'E', '  \n': 'E', '---': 'HR', '___ a': 'HR', '- --': 'L', '^ab-1': 'BI', '^': 'O',
+                'text': 'O', '\u3000- a': 'IL'}
+    assert {line: md.line_type(line) for line in expected} == expected
@@ -0,0 +1,50 @@
+"""SubPath and the module-level helpers of wjkim.pathlib"""
+import numpy as np
+from wjkim.pathlib import explore, missing_grid_points
+
+
+def test_missing_grid_points_of_nothing(tmp_path):
+    arr = explore(f'{tmp_path}/${{ntype}}_${{cost:.2f}}_${{trial}}.pkl', as_array=True)
+    assert len(arr) == 0
+
+    missing = missing_grid_points(arr, ntype=['BA', 'ER'], cost=[0.1, 0.2])
+    assert missing.tolist() == [('BA', 0.1), ('BA', 0.2), ('ER', 0.1), ('ER', 0.2)]
+
+    missing = missing_grid_points(arr, 'ntype', cost=[0.1, 0.2])  # No values of ntype to make a grid of
+    assert len(missing) == 0 and missing.dtype.names == ('ntype', 'cost')
+    assert np.issubdtype(missing.dtype['cost'], np.floating)
+
+
+def test_dir_index_racy(tmp_path):
+    import os
+    import time
+    from wjkim.pathlib import DirIndex
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'a.pkl').touch()
+    index = DirIndex(roots=[data], cache_dir=tmp_path / 'cache').enable()
+    try:
+        assert explore(f'{data}/${{name}}.pkl')['name'] == ['a']
+        assert index.info()['roots'][str(data)] == 0  # Just modified, so not cached
+
+        (data / 'b.pkl').touch()  # As if within the same tick of a coarse mtime
+        old = time.time() - 10
+        os.utime(data, (old, old))
+        assert sorted(explore(f'{data}/${{name}}.pkl')['name']) == ['a', 'b']
+        assert index.info()['roots'][str(data)] == 1
+        assert sorted(explore(f'{data}/${{name}}.pkl')['name']) == ['a', 'b']
+        assert index.info()['hits'] == 1
+    finally:
+        index.disable()
+        index.drop()
+
+
+def test_glob_dstar(tmp_path, monkeypatch):
+    from wjkim.pathlib import glob
+    for path in ['a/b/z.txt', 'a/y.txt', 'x.txt', 'c/.hidden']:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).touch()
+    monkeypatch.chdir(tmp_path)
+    assert [str(p) for p in glob('**')] == ['a', 'a/b', 'a/b/z.txt', 'a/y.txt', 'c', 'x.txt']
+    assert [str(p) for p in glob('**/*.txt')] == ['a/b/z.txt', 'a/y.txt', 'x.txt']
+    assert [str(p) for p in glob(f'{tmp_path}/**')][0] == str(tmp_path)
@@ -0,0 +1,117 @@
+"""tar() and shards()"""
+import os
+import shutil
+import pickle
+import tarfile
+import pytest
+import wjkim.tarfile
+from wjkim.tarfile import tar, TarIndex
+
+
+OBJS = {f'{i}.pkl': list(range(i * 1000)) for i in range(40)}
+
+
+def write(path, compression=None):
+    with tar(str(path), 'w', compression=compression) as tf:
+        for name, obj in OBJS.items():
+            tf.add_object(name, obj)
+
+
+def read(path):
+    with tar(str(path)) as tf:
+        return {name: pickle.load(file) for name, file in zip(tf.mem_names, tf)}, tf.index
+
+
+@pytest.mark.parametrize('codec', ['gz', 'xz'])
+def test_blocks_recovered_without_index(tmp_path, codec):
+    path = tmp_path / f'A.tar.{codec}'
+    write(path, codec)
+    blocks = TarIndex.load(path).blocks
+    assert len(blocks) > 1
+
+    os.remove(TarIndex.path_of(path))
+    objs, index = read(path)
+    assert objs == OBJS and index.blocks == blocks and index.codec == codec
+    assert TarIndex.load(path).blocks == blocks
+
+
+@pytest.mark.parametrize('codec', [None, 'gz'])
+def test_index_valid_for_copy(tmp_path, codec):
+    path = tmp_path / 'A.tar'
+    write(path, codec)
+    os.mkdir(tmp_path / 'copy')
+    shutil.copyfile(path, tmp_path / 'copy' / 'A.tar')  # New mtime
+    shutil.copyfile(TarIndex.path_of(path), tmp_path / 'copy' / 'A.tar.idx')
+    assert TarIndex.load(tmp_path / 'copy' / 'A.tar') is not None
+    assert read(tmp_path / 'copy' / 'A.tar')[0] == OBJS
+
+
+def test_index_stale_once_modified(tmp_path):
+    path = tmp_path / 'A.tar'
+    write(path)
+    with open(path, 'r+b') as file:
+        file.seek(-10, os.SEEK_END)
+        file.write(b'x')
+    assert TarIndex.load(path) is None
+
+
+@pytest.mark.parametrize('max_block_size', [None, 1000])
+def test_stdlib_tar_gz(tmp_path, monkeypatch, max_block_size):
+    """A single stream, decompressed as a whole unless too large for a block"""
+    if max_block_size is not None:
+        monkeypatch.setattr(wjkim.tarfile, '_MAX_BLOCK_SIZE', max_block_size)
+    path = tmp_path / 'A.tar.gz'
+    src = tmp_path / 'src'
+    src.mkdir()
+    for name, obj in OBJS.items():
+        with open(src / name, 'wb') as file:
+            pickle.dump(obj, file)
+    with tarfile.open(path, 'w:gz') as tf:
+        for name in OBJS:
+            tf.add(src / name, arcname=name)
+    objs, index = read(path)
+    assert objs == OBJS and (index.blocks is None if max_block_size else len(index.blocks) == 1)
+
+
+@pytest.mark.parametrize('view', [False, True])
+def test_map(tmp_path, view):
+    path = tmp_path / 'A.tar'
+    write(path)
+    with tar(str(path), view=view) as tf:
+        assert list(tf.map(workers=2)) == list(OBJS.values())
+        for i, _ in enumerate(tf.map(workers=2, chunksize=1)):
+            if i == 2:
+                break
+
+
+def test_iter_close_skips_directories(tmp_path):
+    path = tmp_path / 'A.tar'
+    (tmp_path / 'dir').mkdir()
+    (tmp_path / 'x.pkl').write_bytes(pickle.dumps('x'))
+    with tarfile.open(path, 'w') as tf:
+        tf.add(tmp_path / 'dir', arcname='dir')
+        tf.add(tmp_path / 'x.pkl', arcname='x.pkl')
+    with tar(str(path)) as tf:
+        assert [pickle.load(file) for file in tf.iter_close()] == ['x']
+
+
+def test_background_error_closes_queued(tmp_path):
+    import io
+    files = []
+
+    class Fails(io.BytesIO):
+        def read(self, *args):
+            raise RuntimeError('read failed')
+
+    with pytest.raises(RuntimeError):
+        with tar(str(tmp_path / 'A.tar'), 'w', background=True) as tf:
+            tf.add_bytes('first.pkl', b'x')
+            for i in range(20):
+                with tf.open_member(f'{i}.pkl') as file:
+                    file.write(b'data')
+                    files.append(file)
+                if i == 0:
+                    info = tarfile.TarInfo('fails.pkl')
+                    info.size = 1
+                    tf._put(tf._addfile, info, Fails(b'y'))
+    assert all(file.closed for file in files)
@@ -1,18 +1,35 @@
 __all__ = [
-    'SubStr', 'SubPath', 's', 'ss', 'p', 'o', 'glob', 'explore', 'rename', 'copy',
-    'tar',
+    'SubStr', 'SubPath', 's', 's_batch', 'ss', 'p', 'o', 'glob', 'explore', 'scan', 'rename', 'copy',
+    'tar', 'shards',
     'modify_rcparams', 'AxesLocator', 'al',
     'get_workers',
 ]
-from .pathlib import SubStr, SubPath, s, ss, p, o, glob, explore, rename, copy
-from .tarfile import tar
-from .pyplot import modify_rcparams, AxesLocator, al
-from .lab import col_wrap
-from .md import MdConvert
-from .argparse import get_workers
-from . import lab
-from . import pathlib
-from . import random
-from . import tarfile
-from . import yaml
-from . import md
+# Submodules and their contents are imported on first access via __getattr__ below,
+# so that e.g. `wj.s` does not pay for matplotlib, omegaconf or numpy.
+import importlib
+
+_attrs = {
+    **dict.fromkeys(['SubStr', 'SubPath', 's', 's_batch', 'ss', 'p', 'o', 'glob', 'explore', 'scan', 'rename', 'copy'],
+                    'pathlib'),
+    **dict.fromkeys(['tar', 'shards'], 'tarfile'),
+    **dict.fromkeys(['modify_rcparams', 'AxesLocator', 'al'], 'pyplot'),
+    'col_wrap': 'lab',
+    'MdConvert': 'md',
+    'get_workers': 'argparse',
+}
+_submodules = ['argparse', 'experimental', 'lab', 'md', 'pathlib', 'pyplot', 'random', 'tarfile', 'yaml']
+
+
+def __getattr__(name):
+    if name in _attrs:
+        value = getattr(importlib.import_module(f'.{_attrs[name]}', __name__), name)
+    elif name in _submodules:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_attrs, *_submodules})
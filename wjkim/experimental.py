@@ -1,3 +1,33 @@
+import os
+import re
+import bz2
+import sys
+import gzip
+import json
+import lzma
+import mmap
+import types
+import pickle
+import zlib
+import struct
+import hashlib
+import asyncio
+import weakref
+import threading
+from time import perf_counter
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from .pathlib import SubPath, _grid_rows, _listdir
+
+try:
+    import fcntl
+except ImportError:  # e.g. Windows, where gen is not guarded across processes
+    fcntl = None
+
+
 class Quick:
     """
     Basic purpose:
@@ -19,7 +49,10 @@ class Quick:
                 Assume <gen>(**<kwargs>) as its signature
         (dump): specified by .dump('dump')(<dump>)
                 If not given, pickle.dump() with mode='wb' will be used.
-                Assume <dump>(<obj>, <exact_file_name>, **kwargs) as its signature
+                Assume <dump>(<obj>, <tmp_file_name>, **kwargs) as its signature,
+                where <tmp_file_name> = <exact_file_name> renamed as `.<stem>.<pid>.<tid><suffix>` in the same directory.
+                Write exactly to the path given: it is moved to <exact_file_name> afterwards, atomically,
+                but nothing else written, e.g. a sidecar file named after it, is moved or cleaned up.
 
     Step 1. initiate: Same as SubPath - It will use cache, so don't need to store the instance
     Step 2. register: by wrapping a function to register its .gen, (optional) .load and (optional) .dump
@@ -28,7 +61,7 @@ class Quick:
     Upon self.get(**kwargs), each method will take the following as its input
         self.gen(.) <- **kwargs
         self.load(.) <- self.fname.s(**kwargs), **kwargs
-        self.dump(.) <- (self.gen(**kwargs), self.fname.s(**kwargs), **kwargs)
+        self.dump(.) <- (self.gen(**kwargs), <tmp_file_name>, **kwargs), then <tmp_file_name> -> self.fname.s(**kwargs)
 
     Usage 1 - The simplest - real "Quick" version
         q = Quick('$rsrc/lite/trial17/BA_0.50.pkl').load()
@@ -62,35 +95,95 @@ class Quick:
 
         if __name__ == '__main__':
             my_obj = Quick('$rsrc/${ntype}_${cost}.pkl').get(ntype='BA', cost=0.5)
+
+    Usage 4 - Keep the last 64 objects in memory too, e.g. for repeated lookups within an analysis
+        q = Quick('$rsrc/${ntype}_${cost}.pkl').memory(maxsize=64)
+        my_obj = q.get(ntype='BA', cost=0.5)  # From the file
+        my_obj = q.get(ntype='BA', cost=0.5)  # From memory, unless the file has been modified since
+        print(q.memory_info())
+
+    Usage 5 - Over a grid at once, generating the missing ones in parallel
+        objs = Quick('$rsrc/${ntype}_${cost}.pkl').get_many(dict(ntype=['BA', 'ER'], cost=[0.5, 0.5]), workers=8)
+
+    Usage 6 - Built-in serialization backends, chosen by the suffix of the file or by name, see _BACKENDS
+        arr = Quick('$rsrc/${ntype}_${cost}.npy').get(ntype='BA', cost=0.5)  # Memory-mapped, read-only
+        obj = Quick('$rsrc/${ntype}_${cost}.pkl').backend('pickle5').get(ntype='BA', cost=0.5)
+
+    Usage 7 - Regenerate what an older gen made, once gen is modified (or its version bumped)
+        @Quick('$rsrc/${ntype}_${cost}.pkl').register('gen', version=2)
+        def gen(ntype, cost):
+            ...
+        print(Quick('$rsrc/${ntype}_${cost}.pkl').stale(dict(ntype=['BA', 'ER'], cost=[0.5, 0.5])))
+        Each generated file is stamped by a hidden `.<file>.meta.json`, with the fingerprint of gen:
+        its code, default arguments, the values it closes over, and version.
+        A file whose stamp differs is regenerated by .get(); a file without one is taken as it is.
+
+    Usage 8 - In asyncio, without blocking the event loop
+        obj = await Quick('$rsrc/${ntype}_${cost}.pkl').aget(ntype='BA', cost=0.5)
+        objs = await Quick('$rsrc/${ntype}_${cost}.pkl').aconfig(limit=8).aget_many(dict(ntype=..., cost=...))
+
+    Registry: Quick(<file_name>) gives the same instance for the same template as given, across threads,
+        and whatever the constants are at the time, e.g. within constants.override(), as they are substituted
+        only when a path is built.
+        Quick.clear_registry() forgets all of them, and Quick.clear_registry(weak=True) keeps them from then on
+        only while referenced elsewhere; note that registration by decorators alone is then lost.
+        Instances (and thus e.g. their bound .get) are pickled by template and registered functions,
+        the latter by reference, so that they reach the workers of a process pool with fork or spawn alike.
+
+    Concurrency: .get() generates a missing file once, even if many processes ask for it at the same time;
+        the first one takes a lock file next to it (`.<name>.lock`) and generates, while the others wait and load.
+        .dump() writes to a temporary file next to the target and renames it, so no one sees it half-written.
     """
-    __cache__ = {}
+    __cache__: '_Registry'
 
     def __new__(cls, fname):
-        if fname in cls.__cache__:
-            return cls.__cache__[fname]
-        return super().__new__(cls)
+        with cls.__cache__.lock:
+            if (self := cls.__cache__.get(fname)) is None:
+                self = super().__new__(cls)
+                self._setup(fname)
+                cls.__cache__.set(fname, self)
+            return self
 
     def __init__(self, fname: str):
-        if fname in self.__cache__:
-            return
-        else:
-            self.__cache__[fname] = self
+        pass  # Set up only once, by __new__
+
+    def __reduce__(self):
+        registered = {attr: getattr(self, attr) for attr in _TRANSFERRED if getattr(self, attr) is not None}
+        return _restore, (self.fname.template, registered)
+
+    @classmethod
+    def clear_registry(cls, weak=None):
+        """Forget every instance; weak=True/False: hold them weakly/strongly from then on"""
+        cls.__cache__.clear(weak=weak)
+
+    def _setup(self, fname: str):
         self.fname: SubPath = SubPath(fname)
         self._exist = None
         self._load = None
         self._dump = None
         self._gen = None
+        self._memory: None | _Memory = None
+        self._backend = None
+        self._fingerprint = None  # Of gen
+        self._fresh = {}  # path: (st_mtime_ns, st_size) of the file when its stamp was found fresh
+        self._limit = 16
+        self._executor = 'process'
+        self._workers = None
+        self._inflight = weakref.WeakKeyDictionary()  # loop: {path: Task}
+        self._semaphores = weakref.WeakKeyDictionary()  # loop: Semaphore
+        self._alock = threading.Lock()  # Of the two above, as .aget() may run on the loops of several threads
 
     def s(self, **kwargs):
         return self.fname.s(**kwargs)
 
-    def register(self, ftype):
+    def register(self, ftype, version=None):
+        """version: of gen, to bump when it changes in a way its code does not show, e.g. in what it calls"""
         if ftype == 'exist':
             return self._register_exist
         elif ftype == 'load':
             return self._register_load
         elif ftype == 'gen':
-            return self._register_gen
+            return partial(self._register_gen, version=version)
         elif ftype == 'dump':
             return self._register_dump
 
@@ -102,8 +195,10 @@ class Quick:
         self._load = func
         return func
 
-    def _register_gen(self, func):
+    def _register_gen(self, func, version=None):
         self._gen = func
+        self._fingerprint = _fingerprint(func, version)
+        self._fresh = {}
         return func
 
     def _register_dump(self, func):
@@ -118,10 +213,17 @@ class Quick:
         else:
             raise ValueError(f'Quick.exist not prepared')
 
+    def backend(self, name):
+        """Load and dump with the built-in backend `name` of _BACKENDS, instead of the one of the file's suffix"""
+        if name not in _BACKENDS:
+            raise ValueError(f'Unknown backend: {name}, not one of {list(_BACKENDS)}')
+        self._backend = name
+        return self
+
     def load(self, **kwargs):
         if self._load is None:
-            with open(self.s(**kwargs), 'rb') as file:
-                return pickle.load(file)
+            path = self.s(**kwargs)
+            return _BACKENDS[self._backend or _backend_of(path, sniff=True)][0](path)
         elif callable(self._load):
             return self._load(self.s(**kwargs), **kwargs)
         else:
@@ -134,19 +236,618 @@ class Quick:
             return self._gen(**kwargs)
 
     def dump(self, res, **kwargs):
-        if self._dump is None:
-            with open(self.s(**kwargs), 'wb') as file:
-                pickle.dump(res, file)
-        elif callable(self._dump):
-            self._dump(res, self.s(**kwargs), **kwargs)
-        else:
-            raise ValueError(f'Quick.dump not prepared')
+        path = self.fname.s(mkdir=True, **kwargs)
+        tmp_path = path.with_name(f'.{path.stem}.{os.getpid()}.{threading.get_ident()}{path.suffix}')
+        try:
+            if self._dump is None:
+                _BACKENDS[self._backend or _backend_of(path)][1](res, tmp_path)
+            elif callable(self._dump):
+                self._dump(res, tmp_path, **kwargs)
+            else:
+                raise ValueError(f'Quick.dump not prepared')
+            if tmp_path.exists():  # Unless a custom dump ignored the name given
+                os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def memory(self, maxsize=128, max_bytes=None, sizer=sys.getsizeof, validate=True):
+        """
+        Keep the objects got in memory as well, by path, up to `maxsize` objects and `max_bytes` measured by `sizer`,
+        evicting the least recently used. If validate, an object is dropped once its file's mtime changes.
+        Note that the same object is returned each time, so copy it before modifying.
+        """
+        self._memory = _Memory(maxsize=maxsize, max_bytes=max_bytes, sizer=sizer, validate=validate)
+        return self
+
+    def memory_info(self):
+        return self._memory.info()
 
     def get(self, **kwargs):
+        if self._memory is None:
+            return self._get(**kwargs)
+        path = str(self.s(**kwargs))
+        if (res := self._memory.get(path)) is not _MISSING:
+            return res
+        res = self._get(**kwargs)
+        self._memory.put(path, res)
+        return res
+
+    def get_many(self, grid, *, keys=None, workers=None, executor='process', stream=False):
+        """
+        .get() for every point of `grid`, in the forms accepted by SubPath.s_many().
+        Existence is checked by listing each directory once, the existing files are loaded on threads, and
+        only the missing points are generated on `workers` processes (or threads), each dumped as it completes.
+        gen must then be picklable, i.e. defined at the top level of a module, and is not guarded by lock files.
+
+        Returns the results in grid order, or if stream, yields (kwargs, result) as each one is ready.
+        Points resolving to the same path are got only once, and through the memory tier as by .get(), if any.
+        """
+        assert executor in ['process', 'thread']
+        names, rows = _grid_rows(grid, keys=keys)
+        points = [dict(zip(names, row)) for row in rows]
+        groups = {}  # path: indices of its points
+        for i, path in enumerate(self.fname.s_many(points, as_str=True)):
+            groups.setdefault(path, []).append(i)
+        paths, groups = list(groups), list(groups.values())
+        unique = [points[group[0]] for group in groups]
+        results = self._iget_many(unique, paths, self._exist_many(unique, paths), workers, executor)
+        if stream:
+            return ((points[i], res) for j, res in results for i in groups[j])
+        ordered = [None] * len(points)
+        for j, res in results:
+            for i in groups[j]:
+                ordered[i] = res
+        return ordered
+
+    def _exist_many(self, points, paths):
+        if self._exist is not None:
+            return [self.exist(**kwargs) for kwargs in points]
+        files = {}  # dir: names of the files in it
+        exists = []
+        for path in paths:
+            parent, name = os.path.split(path)
+            if (names := files.get(parent)) is None:
+                names = files[parent] = {name for name, is_dir in _listdir(parent) if not is_dir}
+            exists.append(name in names)
+        return exists
+
+    def _iget_many(self, points, paths, exists, workers, executor):
+        """(i, result) of `points` as each one is ready, through the memory tier as .get()"""
+        memory = self._memory
+        keys = [str(Path(path)) for path in paths] if memory is not None else None  # As str(self.s()) of .get()
+        cached = {}  # i: result in memory
+        if memory is not None:
+            for i, key in enumerate(keys):
+                if (res := memory.get(key)) is not _MISSING:
+                    cached[i] = res
+        if not all(exist or i in cached for i, exist in enumerate(exists)) and not callable(self._gen):
+            raise ValueError(f'Quick.gen not prepared')
+        pool_cls = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+        with ThreadPoolExecutor(workers) as loader, pool_cls(workers) as generator:
+            yield from cached.items()
+            pending = {}  # future: (i, generated)
+            for i, exist in enumerate(exists):
+                if i in cached:
+                    continue
+                elif exist:
+                    pending[loader.submit(self._load_existing, **points[i])] = (i, False)
+                else:
+                    pending[generator.submit(_timed, self._gen, points[i])] = (i, True)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, generated = pending.pop(future)
+                    if (res := future.result()) is _MISSING:  # e.g. stale, or truncated since listed
+                        pending[generator.submit(_timed, self._gen, points[i])] = (i, True)
+                        continue
+                    if generated:
+                        res, elapsed = res
+                        self._dump_generated(res, elapsed, **points[i])
+                    if memory is not None:
+                        memory.put(keys[i], res)
+                    yield i, res
+
+    def aconfig(self, limit=16, executor='process', workers=None):
+        """
+        For .aget(): at most `limit` loads/dumps at once per event loop, and gen on `workers` processes
+        (or threads), in a pool shared by all Quick
+        """
+        assert executor in ['process', 'thread']
+        with self._alock:
+            self._limit, self._executor, self._workers = limit, executor, workers
+            self._semaphores = weakref.WeakKeyDictionary()
+        return self
+
+    async def aget(self, **kwargs):
+        """
+        .get() as a coroutine: exist/load/dump run on threads and gen in a process pool, see .aconfig().
+        Concurrent awaits for the same file share one computation. Not guarded by lock files across processes.
+        """
+        loop = asyncio.get_running_loop()
+        path = str(self.s(**kwargs))
+        inflight = self._of_loop(self._inflight, loop, dict)  # Only ever touched in the thread of `loop`
+        if (task := inflight.get(path)) is None:
+            task = inflight[path] = loop.create_task(self._aget(loop, path, kwargs))
+            task.add_done_callback(lambda _: inflight.pop(path, None))
+        return await asyncio.shield(task)  # Cancelling one await does not cancel the others'
+
+    def aget_many(self, grid, *, keys=None, stream=False):
+        """
+        .aget() for every point of `grid`, in the forms accepted by SubPath.s_many():
+            results = await q.aget_many(grid)                     # In grid order
+            async for kwargs, res in q.aget_many(grid, stream=True):  # As each one is ready
+        """
+        names, rows = _grid_rows(grid, keys=keys)
+        points = [dict(zip(names, row)) for row in rows]
+        if stream:
+            return self._astream(points)
+        return self._agather(points)
+
+    async def _agather(self, points):
+        return await asyncio.gather(*(self.aget(**kwargs) for kwargs in points))
+
+    async def _astream(self, points):
+        async def pair(kwargs):
+            return kwargs, await self.aget(**kwargs)
+        for future in asyncio.as_completed([pair(kwargs) for kwargs in points]):
+            yield await future
+
+    async def _aget(self, loop, path, kwargs):
+        io_pool = _pool('thread', None)
+        async with self._semaphore(loop):
+            res = await loop.run_in_executor(io_pool, self._load_cached, path, kwargs)
+        if res is not _MISSING:
+            return res
+        if not callable(self._gen):
+            raise ValueError(f'Quick.gen not prepared')
+        res, elapsed = await loop.run_in_executor(_pool(self._executor, self._workers), _timed, self._gen, kwargs)
+        async with self._semaphore(loop):
+            await loop.run_in_executor(io_pool, partial(self._dump_generated, res, elapsed, **kwargs))
+        if self._memory is not None:
+            self._memory.put(path, res)
+        return res
+
+    def _load_cached(self, path, kwargs):
+        if self._memory is None:
+            return self._load_existing(**kwargs)
+        if (res := self._memory.get(path)) is _MISSING and (res := self._load_existing(**kwargs)) is not _MISSING:
+            self._memory.put(path, res)
+        return res
+
+    def _semaphore(self, loop):
+        return self._of_loop(self._semaphores, loop, lambda: asyncio.Semaphore(self._limit))
+
+    def _of_loop(self, states, loop, factory):
+        with self._alock:
+            if (state := states.get(loop)) is None:
+                state = states[loop] = factory()
+            return state
+
+    def _get(self, **kwargs):
+        if (res := self._load_existing(**kwargs)) is not _MISSING:
+            return res
+        with _flock(self.s(**kwargs)):  # Single flight: the others wait, then load what the first one dumped
+            if (res := self._load_existing(**kwargs)) is not _MISSING:
+                return res
+            res, elapsed = _timed(self.gen, kwargs)
+            self._dump_generated(res, elapsed, **kwargs)
+            return res
+
+    def _load_existing(self, **kwargs):
         try:
-            assert self.exist(**kwargs)
+            assert self.exist(**kwargs) and not self._is_stale(self.s(**kwargs))
             return self.load(**kwargs)
-        except (AssertionError, EOFError):
-            res = self.gen(**kwargs)
-            self.dump(res, **kwargs)
-            return res
+        except (AssertionError, *_CORRUPTED):
+            return _MISSING
+
+    def _dump_generated(self, res, elapsed, **kwargs):
+        self.dump(res, **kwargs)
+        meta = dict(gen=self._fingerprint, kwargs={key: repr(value) for key, value in kwargs.items()}, elapsed=elapsed)
+        _write_meta(self.s(**kwargs), meta)
+
+    def _is_stale(self, path):
+        """Generated by another gen, or version of it, than the registered one. Not stamped at all is not stale."""
+        if self._fingerprint is None:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if self._fresh.get(path := os.fspath(path)) == (sig := (st.st_mtime_ns, st.st_size)):
+            return False
+        if (meta := _read_meta(path)) is not None and meta.get('gen') != self._fingerprint:
+            return True
+        if len(self._fresh) >= 2**16:
+            self._fresh.clear()
+        self._fresh[path] = sig
+        return False
+
+    def stale(self, grid, *, keys=None):
+        """
+        What .get_many(grid) would generate, without loading or generating anything:
+            dict(missing=[kwargs, ...], stale=[kwargs, ...], fresh=[kwargs, ...],
+                 seconds=<how long gen took for the stale ones, as last recorded>)
+        """
+        names, rows = _grid_rows(grid, keys=keys)
+        points = [dict(zip(names, row)) for row in rows]
+        paths = self.fname.s_many(points, as_str=True)
+        report = dict(missing=[], stale=[], fresh=[], seconds=0.)
+        for kwargs, path, exist in zip(points, paths, self._exist_many(points, paths)):
+            if not exist:
+                report['missing'].append(kwargs)
+            elif self._is_stale(path):
+                report['stale'].append(kwargs)
+                report['seconds'] += _read_meta(path).get('elapsed') or 0.
+            else:
+                report['fresh'].append(kwargs)
+        return report
+
+
+class _Registry:
+    """Quick instances by their template as given, see Quick"""
+    def __init__(self, weak=False):
+        self.lock = threading.RLock()
+        self.weak = weak
+        self.instances = weakref.WeakValueDictionary() if weak else {}
+
+    @staticmethod
+    def key(fname):
+        """Not resolved against the constants, which may change, e.g. by constants.override()"""
+        return fname
+
+    def get(self, fname):
+        return self.instances.get(self.key(fname))
+
+    def set(self, fname, quick):
+        self.instances[self.key(fname)] = quick
+
+    def __contains__(self, fname):
+        return self.get(fname) is not None
+
+    def __getitem__(self, fname):
+        if (quick := self.get(fname)) is None:
+            raise KeyError(fname)
+        return quick
+
+    def __len__(self):
+        return len(self.instances)
+
+    def clear(self, weak=None):
+        with self.lock:
+            self.weak = self.weak if weak is None else weak
+            self.instances = weakref.WeakValueDictionary() if self.weak else {}
+
+    def _after_fork(self):
+        """The locks may have been held by another thread of the parent, which does not exist in the child"""
+        self.lock = threading.RLock()
+        for quick in list(self.instances.values()):
+            quick._alock = threading.Lock()
+            if quick._memory is not None:
+                quick._memory.lock = threading.Lock()
+
+
+Quick.__cache__ = _Registry()
+_pools = {}  # (executor, workers): Executor shared by Quick.aget()
+_pools_lock = threading.Lock()
+
+
+def _pool(executor, workers):
+    with _pools_lock:
+        if (pool := _pools.get((executor, workers))) is None:
+            pool_cls = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+            pool = _pools[executor, workers] = pool_cls(workers)
+        return pool
+
+
+def _pools_after_fork():
+    """Those of the parent are not usable, and the lock may have been held by another thread of it"""
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    _pools.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=Quick.__cache__._after_fork)
+    os.register_at_fork(after_in_child=_pools_after_fork)
+
+_TRANSFERRED = ['_exist', '_load', '_gen', '_dump', '_backend', '_fingerprint']
+
+
+def _restore(fname, registered):
+    """Quick(fname) of this process, with what was registered where it was pickled unless registered here too"""
+    quick = Quick(fname)
+    for attr, value in registered.items():
+        if getattr(quick, attr) is None:
+            setattr(quick, attr, value)
+    return quick
+
+
+_MISSING = object()
+
+
+def _timed(func, kwargs):
+    start = perf_counter()
+    res = func(**kwargs)
+    return res, perf_counter() - start
+
+
+def _fingerprint(func, version=None):
+    """
+    Of the code of `func`, not of where it is, e.g. its line numbers, together with `version`,
+    its default arguments and the values it closes over
+    """
+    digest = hashlib.sha256(_const_repr(version).encode())
+    _digest_func(func, digest, set())
+    return digest.hexdigest()[:16]
+
+
+def _digest_func(func, digest, seen):
+    if (code := getattr(func, '__code__', None)) is None or id(func) in seen:
+        return
+    seen.add(id(func))
+    _digest_code(code, digest)
+    digest.update(_const_repr(func.__defaults__).encode())
+    digest.update(_const_repr(func.__kwdefaults__).encode())
+    for cell in func.__closure__ or ():
+        try:
+            value = cell.cell_contents
+        except ValueError:  # Not assigned yet
+            digest.update(b'<empty cell>')
+            continue
+        if isinstance(value, types.FunctionType):  # e.g. what a decorator wraps
+            _digest_func(value, digest, seen)
+        else:
+            digest.update(_const_repr(value).encode())
+
+
+def _digest_code(code, digest):
+    digest.update(code.co_code)
+    digest.update(repr((code.co_names, code.co_varnames, code.co_freevars)).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):  # e.g. of a nested function or a comprehension
+            _digest_code(const, digest)
+        else:
+            digest.update(_const_repr(const).encode())
+
+
+def _const_repr(const):
+    """
+    repr, but not in the hash order of sets, which changes with PYTHONHASHSEED,
+    nor with the memory addresses in the default repr of objects
+    """
+    if isinstance(const, (set, frozenset)):
+        return f'{type(const).__name__}({{{", ".join(sorted(map(_const_repr, const)))}}})'
+    elif isinstance(const, (tuple, list)):
+        return f'{type(const).__name__}({"".join(_const_repr(x) + ", " for x in const)})'
+    elif isinstance(const, dict):
+        items = sorted(f'{_const_repr(key)}: {_const_repr(value)}' for key, value in const.items())
+        return f'dict({", ".join(items)})'
+    return _ADDRESS.sub('', repr(const))
+
+
+_ADDRESS = re.compile(r' at 0x[0-9a-fA-F]+')
+
+
+def _meta_path(path):
+    """Hidden, as the lock file is, so that it is out of the way of `*` and ${key} of glob(), explore() etc."""
+    return path.with_name(f'.{path.name}.meta.json')
+
+
+def _read_meta(path):
+    """None if missing or unreadable"""
+    try:
+        with open(_meta_path(Path(path)), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(path, meta):
+    meta_path = _meta_path(path)
+    tmp_path = meta_path.with_name(f'.{meta_path.name}.{os.getpid()}.{threading.get_ident()}')
+    with open(tmp_path, 'w') as file:
+        json.dump(meta, file)
+    os.replace(tmp_path, meta_path)
+
+
+def _load_pickle(path):
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+def _dump_pickle(obj, path):
+    with open(path, 'wb') as file:
+        pickle.dump(obj, file)
+
+
+def _compressed_pickle(opener):
+    def load(path):
+        with opener(path, 'rb') as file:
+            return pickle.load(file)
+
+    def dump(obj, path):
+        with opener(path, 'wb') as file:
+            pickle.dump(obj, file, protocol=pickle.HIGHEST_PROTOCOL)
+    return load, dump
+
+
+_PICKLE5_MAGIC = b'WJPKL5\x00\x00'
+_ALIGN = 64
+
+
+def _load_pickle5(path):
+    """
+    Pickle protocol 5 with its out-of-band buffers, e.g. the data of NumPy arrays, mapped in memory:
+    the arrays are read-only views into the file, loaded lazily and shared by the processes reading it
+    """
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < 16:
+            raise EOFError(f'Truncated: {path}')
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:8] != _PICKLE5_MAGIC:
+        raise ValueError(f'Not dumped by the pickle5 backend: {path}')
+    n, = struct.unpack_from('<Q', mm, 8)
+    sizes = struct.unpack_from(f'<{n}Q', mm, 16)
+    view = memoryview(mm)
+    pos = 16 + 8 * n
+    chunks = []
+    for size in sizes:
+        pos += -pos % _ALIGN
+        chunks.append(view[pos:pos+size])
+        pos += size
+    return pickle.loads(chunks[0], buffers=chunks[1:])
+
+
+def _dump_pickle5(obj, path):
+    """magic | n | sizes of the pickle and each buffer | pickle | buffers, each aligned to 64 bytes"""
+    buffers = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    chunks = [data, *(buffer.raw() for buffer in buffers)]
+    with open(path, 'wb') as file:
+        file.write(_PICKLE5_MAGIC + struct.pack(f'<{len(chunks) + 1}Q', len(chunks), *map(len, chunks)))
+        for chunk in chunks:
+            file.write(bytes(-file.tell() % _ALIGN))
+            file.write(chunk)
+
+
+def _load_npy(path):
+    """Memory-mapped, read-only"""
+    import numpy as np
+    return np.load(path, mmap_mode='r')
+
+
+def _dump_npy(obj, path):
+    import numpy as np
+    with open(path, 'wb') as file:  # Not to let np.save() append '.npy' to the name
+        np.save(file, obj, allow_pickle=False)
+
+
+def _load_npz(path):
+    """dict of arrays, all read at once as .npz is a zip"""
+    import numpy as np
+    with np.load(path) as npz:
+        return dict(npz)
+
+
+def _dump_npz(obj, path):
+    import numpy as np
+    with open(path, 'wb') as file:
+        np.savez(file, **obj)
+
+
+_BACKENDS = {  # name: (load(path), dump(obj, path))
+    'pickle': (_load_pickle, _dump_pickle),
+    'pickle5': (_load_pickle5, _dump_pickle5),
+    'pickle.gz': _compressed_pickle(partial(gzip.open, compresslevel=6)),
+    'pickle.xz': _compressed_pickle(lzma.open),
+    'pickle.bz2': _compressed_pickle(bz2.open),
+    'npy': (_load_npy, _dump_npy),
+    'npz': (_load_npz, _dump_npz),
+}
+_SUFFIXES = {'.pkl5': 'pickle5', '.gz': 'pickle.gz', '.xz': 'pickle.xz', '.bz2': 'pickle.bz2',
+             '.npy': 'npy', '.npz': 'npz'}
+
+
+_MAGICS = {'pickle5': _PICKLE5_MAGIC, 'pickle.gz': b'\x1f\x8b', 'pickle.xz': b'\xfd7zXZ\x00', 'pickle.bz2': b'BZh',
+           'npy': b'\x93NUMPY', 'npz': b'PK'}
+_CORRUPTED = (EOFError, pickle.UnpicklingError, struct.error, zlib.error, gzip.BadGzipFile, lzma.LZMAError)
+
+
+def _backend_of(path, sniff=False):
+    """
+    By the suffix of `path`, plain pickle by default as before.
+    sniff: plain pickle also if the file does not start as the backend writes it, e.g. a .gz dumped
+        by pickle.dump() before the backends, or an empty file
+    """
+    name = _SUFFIXES.get(path.suffix, 'pickle')
+    if sniff and name in _MAGICS:
+        try:
+            with open(path, 'rb') as file:
+                if not file.read(8).startswith(_MAGICS[name]):
+                    return 'pickle'
+        except OSError:
+            pass
+    return name
+
+
+@contextmanager
+def _flock(path):
+    """Exclusive lock on `.<name>.lock` next to `path`, removed on release"""
+    if fcntl is None:
+        yield
+        return
+    lock_path = path.with_name(f'.{path.name}.lock')
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        os.close(fd)  # Removed by the previous holder meanwhile, so lock the new one instead
+    try:
+        yield
+    finally:
+        os.unlink(lock_path)  # Before unlocking, so that those waiting on it retry as above
+        os.close(fd)
+
+
+class _Memory:
+    """LRU of the objects of Quick by path, each valid while its file keeps the same mtime (if validate)"""
+    def __init__(self, maxsize=128, max_bytes=None, sizer=sys.getsizeof, validate=True):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizer = sizer
+        self.validate = validate
+        self.entries = OrderedDict()  # path: (mtime_ns, obj, size), least recently used first
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        mtime = self._mtime(path)
+        with self.lock:
+            if (entry := self.entries.get(path)) is not None:
+                if entry[0] == mtime:
+                    self.entries.move_to_end(path)
+                    self.hits += 1
+                    return entry[1]
+                self._pop(path)
+            self.misses += 1
+        return _MISSING
+
+    def put(self, path, obj):
+        size = self.sizer(obj)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        mtime = self._mtime(path)
+        with self.lock:
+            if path in self.entries:
+                self._pop(path)
+            self.entries[path] = (mtime, obj, size)
+            self.nbytes += size
+            while len(self.entries) > self.maxsize or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self._pop(next(iter(self.entries)))
+
+    def info(self):
+        return dict(hits=self.hits, misses=self.misses, size=len(self.entries), nbytes=self.nbytes)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def _pop(self, path):
+        self.nbytes -= self.entries.pop(path)[2]
+
+    def _mtime(self, path):
+        if not self.validate:
+            return None
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
@@ -109,12 +109,9 @@ class MdConvert:
     # ==================== Converts ====================
     # ==================================================
     def convert(self):
-        self.\
-            convert_callouts().\
-            convert_images().\
-            strict_line_break().\
-            no_empty_lines_in_math_blocks().\
-            no_redundant_double_dollars()
+        # Same as .convert_callouts().convert_images().strict_line_break()
+        #         .no_empty_lines_in_math_blocks().no_redundant_double_dollars(), in a single pass
+        self.lines = convert(self.lines, self.IMG_PATH.absolute())
         return self
 
     def convert_callouts(self):
@@ -252,24 +249,115 @@ def count_depth(x: str, marker: str):
 
 
 def line_type(line: str):
-    q = re.search(r'^(\s*)(\d+\.)|^(\s*)([+-] )|^(#+)|^(\s*)$|^(---)|^(___)|^(\^[a-zA-Z\-0-9]+)', line)
-    if not q:
-        return "O"  # Others
-    x = q.groups()
-    if isinstance(x[0], str) and isinstance(x[1], str):
-        return "L" if not x[0] else "IL"  # List or Indented List
-    elif isinstance(x[2], str) and isinstance(x[3], str):
-        return "L" if not x[2] else "IL"  # bulleted List or Indented bulleted List
-    elif isinstance(x[4], str):
+    # Same as matching r'^(\s*)(\d+\.)|^(\s*)([+-] )|^(#+)|^(\s*)$|^(---)|^(___)|^(\^[a-zA-Z\-0-9]+)' in this order
+    stripped = line.lstrip()
+    if _LIST_ITEM.match(stripped):
+        return "L" if len(stripped) == len(line) else "IL"  # (bulleted) List or Indented (bulleted) List
+    elif line.startswith('#'):
         return "H"  # Headings
-    elif isinstance(x[5], str):
+    elif not stripped:
         return "E"  # Empty line
-    elif isinstance(x[6], str) or isinstance(x[7], str):
+    elif line.startswith(('---', '___')):
         return "HR"  # Horizontal rule
-    elif isinstance(x[8], str):
+    elif _BLOCK_ID.match(line):
         return "BI"  # Block Identifier
+    return "O"  # Others
+
+
+_LIST_ITEM = re.compile(r'\d+\.|[+-] ')
+_BLOCK_ID = re.compile(r'\^[a-zA-Z\-0-9]')
+
+
+def convert(lines: list[str], img_dir: Path):
+    """
+    convert_callouts, convert_images, strict_line_break, no_empty_lines_in_math_blocks and
+    no_redundant_double_dollars in turn, fused into a single pass over `lines` as from file.readlines().
+    Only no_redundant_double_dollars may need the document as a whole, and only from the first "$$"
+    if "\\begin{equation}" or "\\begin{align}" follows.
+    """
+    indent = "  "
+    marker = "> "
+
+    out = []
+    depth = 0  # Of callouts
+    ptype = None  # Line type of the previous line, None for the first one
+    total = 0  # "$$" so far
+    first_dollars = None  # Index in `out` of the first line with "$$"
+    auto_math = False
+    for line in lines:
+        # convert_callouts
+        current_depth = 0
+        while line.startswith(marker, 2*current_depth):
+            current_depth += 1
+        if current_depth > depth:
+            x = _CALLOUT.search(line)
+            typ, title = x.groups() if x else ('note', '')
+            color = CALLOUT_COLORS[typ.lower()]
+            curr = [indent * depth + r"\begin{tcolorbox}"
+                    + f"[colframe={color}!25,colback={color}!10,coltitle={color}!20!black,title={{{title}}}]\n"]
+            depth += 1
+            if not x:
+                curr.append(line.replace(marker, indent, depth))
+        else:
+            curr = []
+            while current_depth < depth:
+                depth -= 1
+                curr.append(indent * depth + "\\end{tcolorbox}\n")
+            curr.append(line.replace(marker, indent, depth))
+
+        for line in curr:
+            # convert_images
+            if '![[' in line and ('.png' in line or '.jpg' in line):
+                line = _image(line, img_dir)
+
+            # strict_line_break
+            ctype = line_type(line)
+            broken = ptype is not None and (ptype, ctype) in _BREAKS
+            ptype = ctype
+
+            # no_empty_lines_in_math_blocks
+            if broken and not total % 2:
+                out.append('\n')
+            total += (dollars := line.count('$$'))
+            if (total % 2) and not line.strip():
+                continue
+
+            # no_redundant_double_dollars, for what can be done line by line
+            if dollars and first_dollars is None:
+                first_dollars = len(out)
+            if first_dollars is not None and ('\\begin{equation}' in line or '\\begin{align}' in line):
+                auto_math = True
+            if _LINE_BREAKS.search(line):
+                out.extend(line.splitlines(keepends=True))
+            elif line:
+                out.append(line)
+
+    if auto_math:
+        out[first_dollars:] = _DOUBLE_DOLLARS.sub(r'\2\3\4', "".join(out[first_dollars:])).splitlines(keepends=True)
+    return out
+
+
+_CALLOUT = re.compile(r'> \[!(\w+)](.*)')
+_BREAKS = {  # (previous, current) line types to put an empty line between, as in strict_line_break
+    *(("O", "L"), ("IL", "L"), ("BI", "L")),
+    *((ptype, "IL") for ptype in ["O", "L", "IL", "H", "HR", "BI"]),
+    *((ptype, ctype) for ptype in ["L", "IL", "HR", "BI"] for ctype in ["O", "H", "HR", "BI"]),
+    *((ptype, "HR") for ptype in ["O", "H"]),
+}
+_LINE_BREAKS = re.compile('[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]|\n.')  # Where str.splitlines() splits but readlines() does not
+_DOUBLE_DOLLARS = re.compile(r'(\$\$\s*)(\\begin{(?:equation|align)})(.*?)(\\end{(?:equation|align)})(\s*\$\$)',
+                             flags=re.DOTALL)
+
+
+def _image(line, img_dir: Path):
+    image_name = line[line.find('[[') + 2:line.find(']]')]
+    if '|' in image_name:
+        width = image_name.split('|')[1]
+        image_name = image_name.split('|')[0]
     else:
-        raise ValueError(f'Unexpected regex result: {line}')
+        width = 500
+    img_path: str = (img_dir / image_name).absolute().as_posix()
+    return f'\\includegraphics[width={width}pt]{{{img_path}}}\n'
 
 
 def convert_callouts(lines: list[str]):
@@ -313,14 +401,7 @@ def convert_images(lines: list[str], img_dir: Path):
     out = []
     for line in lines:
         if '![[' in line and ('.png' in line or '.jpg' in line):
-            image_name = line[line.find('[[') + 2:line.find(']]')]
-            if '|' in image_name:
-                width = image_name.split('|')[1]
-                image_name = image_name.split('|')[0]
-            else:
-                width = 500
-            img_path: str = (img_dir / image_name).absolute().as_posix()
-            out.append(f'\\includegraphics[width={width}pt]{{{img_path}}}\n')
+            out.append(_image(line, img_dir))
         else:
             out.append(line)
     return out
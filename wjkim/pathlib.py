@@ -1,13 +1,21 @@
-__all__ = ['SubStr', 'SubPath', 's', 'ss', 'p', 'o', 'glob', 'explore', 'rename', 'copy']
+__all__ = ['SubStr', 'SubPath', 's', 's_batch', 'ss', 'p', 'o', 'glob', 'explore', 'scan', 'rename', 'copy',
+           'iremap', 'RemapPlan', 'DirIndex', 'constants', 'unique_combinations', 'missing_grid_points']
 
 import os
 import re
 import json
 import gzip
-from glob import glob as _glob
-from shutil import copy as _copy
+import errno
+import time
+import threading
+from functools import lru_cache
+from contextlib import contextmanager
+import shutil
 from pathlib import Path as _Path
 from datetime import datetime
+from operator import itemgetter
+from itertools import chain
+from collections.abc import Iterable, Mapping
 
 
 def s(x: str, *, mkdir=False, **kwargs):
@@ -15,6 +23,11 @@ def s(x: str, *, mkdir=False, **kwargs):
     return sp.s(mkdir=mkdir, **kwargs)
 
 
+def s_batch(x: str, grid, *, keys=None, as_str=False, mkdir=False, **kwargs):
+    sp = SubPath(x)
+    return sp.s_many(grid, keys=keys, as_str=as_str, mkdir=mkdir, **kwargs)
+
+
 def ss(x: str, **kwargs):
     sp = SubPath(x)
     return sp.ss(**kwargs)
@@ -41,12 +54,17 @@ def glob(x, **kwargs):
     return sp.glob(**kwargs)
 
 
-def explore(x, *targets):
+def explore(x, *targets, as_array=False, dtypes=None):
+    sp = SubPath(x)
+    return sp.explore(*targets, as_array=as_array, dtypes=dtypes)
+
+
+def scan(x, **kwargs):
     sp = SubPath(x)
-    return sp.explore(*targets)
+    return sp.scan(**kwargs)
 
 
-def rename(old, new, key=None, skip=False):
+def rename(old, new, key=None, skip=False, workers=None, dry_run=False, progress=False):
     """
     for filepath in glob(old):
         kw= parse_kw(filepath)
@@ -59,67 +77,192 @@ def rename(old, new, key=None, skip=False):
 
          Example usage: 
          `key=lambda x: x | dict(i=int(x['i']) + 10)`
+
+    workers : Number of threads to rename with, see RemapPlan.run()
+    dry_run : Return the RemapPlan without renaming anything
+    progress: True to print the progress, or Callable(done, total)
     """
-    old2new = _remap(old, new, key=key)
-    if skip:
-        return _rename_all(old2new)
-    for i, (_old, _new) in enumerate(old2new.items()):
-        print(f'{i}: {_old.as_posix()} -> {_new.as_posix()}')
-    answer = input('Proceed renaming? y/[n]: ')
-    if answer.lower() in ['y', 'yes']:
-        return _rename_all(old2new)
+    plan = RemapPlan(_remap(old, new, key=key), op='rename')
+    if dry_run:
+        return plan
+    if skip or _confirm(plan, 'Proceed renaming? y/[n]: '):
+        return plan.run(workers=workers, progress=progress)
 
 
-def copy(old, new, key=None, skip=False):
-    old2new = _remap(old, new, key=key)
-    if skip:
-        return _copy_all(old2new)
-    for i, (_old, _new) in enumerate(old2new.items()):
+def copy(old, new, key=None, skip=False, workers=None, dry_run=False, progress=False):
+    plan = RemapPlan(_remap(old, new, key=key), op='copy')
+    if dry_run:
+        return plan
+    if skip or _confirm(plan, 'Proceed copying? y/[n]: '):
+        return plan.run(workers=workers, progress=progress)
+
+
+def _confirm(plan, question):
+    for i, (_old, _new) in enumerate(plan.old2new.items()):
         print(f'{i}: {_old.as_posix()} -> {_new.as_posix()}')
-    answer = input('Proceed copying? y/[n]: ')
-    if answer.lower() in ['y', 'yes']:
-        return _copy_all(old2new)
+    for path in plan.overwrites:
+        print(f'wjkim_Warning: {path.as_posix()} already exists and will be overwritten.')
+    answer = input(question)
+    return answer.lower() in ['y', 'yes']
 
 
 def _remap(old, new, key=None):
-    matches = glob(old)
-    assert matches, f'No files found for {old}'
-    assert 'parent' not in explore(old), 'tag `parent` cannot be used with .rename'
+    return dict(sorted(iremap(old, new, key=key)))
+
+
+def iremap(old, new, key=None):
+    """
+    (old_path, new_path) of rename() and copy() as found by a single scan of `old`, without building the whole map.
+    Wildcards of `new` take the values of those of `old`, i.e. n-th `*` of `new` <- n-th `*` of `old`, and so on.
+    ${parent} in `new` is the parent directory of the first file in the order of glob(), for which `old` is
+    scanned as a whole and sorted first; without ${parent}, pairs are yielded as found.
+    """
+    old_sp = SubPath(old)
+    assert 'parent' not in old_sp.ss().keys, 'tag `parent` cannot be used with .rename'
     assert key is None or callable(key), f'key must be either None or callable'
     key = key if callable(key) else lambda x: x
-    parent = _Path(matches[0]).parent
-
-    old_template = old
-    for i in range(old.count('**')):
-        old = old.replace('**', f'${{__DSTAR{i}__}}', 1)
-    for i in range(old.count('*')):
-        old = old.replace('*', f'${{__STAR{i}__}}', 1)
-    for i in range(old.count('?')):
-        old = old.replace('?', f'${{__QUESTION{i}__}}', 1)
+
     for i in range(new.count('*')):
         new = new.replace('*', f'${{__STAR{i}__}}', 1)
     for i in range(new.count('?')):
         new = new.replace('?', f'${{__QUESTION{i}__}}', 1)
+    new_sp = SubPath(new)
+
+    found = old_sp.scan()
+    if 'parent' in new_sp.keys:
+        found = sorted(found, key=lambda x: str(x[0]))
+    parent = None
+    for old_path, kw in found:
+        if parent is None:
+            parent = old_path.parent
+        yield old_path, new_sp.s(parent=parent, **key(kw))
+    assert parent is not None, f'No files found for {old}'
+
+
+def _rename_all(old2new, workers=None, progress=False):
+    return RemapPlan(old2new, op='rename').run(workers=workers, progress=progress)
+
+
+def _copy_all(old2new, workers=None, progress=False):
+    return RemapPlan(old2new, op='copy').run(workers=workers, progress=progress)
+
+
+class RemapPlan:
+    """
+    Operations of rename() or copy() over `old2new`, ordered so that no file is overwritten before it is moved/read.
+
+        i -> i+10 : 15 -> 25 runs before 5 -> 15
+        a <-> b   : b -> tmp, a -> b, tmp -> a
+
+    chains    : list of [(func, src, dst), ...], each run in order; different chains are independent of each other
+    overwrites: Targets that already exist without being renamed/copied themselves, thus overwritten
+    Raises ValueError if several files are mapped onto the same target.
+    """
+    def __init__(self, old2new, op='rename'):
+        assert op in ['rename', 'copy']
+        self.old2new = {_Path(old): _Path(new) for old, new in old2new.items()}
+        self.op = op
+        func = _move if op == 'rename' else _copy_file
+
+        targets = {}
+        for old, new in self.old2new.items():
+            targets.setdefault(os.path.abspath(new), []).append(old)
+        if collisions := {new: olds for new, olds in targets.items() if len(olds) > 1}:
+            msg = '\n'.join(f'  {", ".join(map(str, olds))} -> {new}' for new, olds in collisions.items())
+            raise ValueError(f'Multiple files mapped onto the same target:\n{msg}')
+
+        nxt = {os.path.abspath(old): (old, new) for old, new in self.old2new.items()
+               if os.path.abspath(old) != os.path.abspath(new)}
+        heads = [key for key in nxt if key not in targets]
+        self.overwrites = [new for key, (_, new) in nxt.items()
+                           if os.path.abspath(new) not in nxt and os.path.lexists(new)]
+
+        self.chains = []
+        for key in heads:  # a -> b -> c, run as b -> c and then a -> b
+            seq = []
+            while key in nxt:
+                old, new = nxt.pop(key)
+                seq.append((func, old, new))
+                key = os.path.abspath(new)
+            self.chains.append(seq[::-1])
+        while nxt:  # Only cycles are left, a -> b -> c -> a, run as c -> tmp, b -> c, a -> b and tmp -> a
+            key = next(iter(nxt))
+            seq = []
+            while key in nxt:
+                old, new = nxt.pop(key)
+                seq.append((func, old, new))
+                key = os.path.abspath(new)
+            _, last, first = seq[-1]
+            tmp = first.with_name(f'.{first.name}.wjkim_tmp')
+            self.chains.append([(func, last, tmp), *seq[-2::-1], (_move, tmp, first)])
+
+    def __len__(self):
+        return sum(len(seq) for seq in self.chains)
+
+    def __iter__(self):
+        for seq in self.chains:
+            yield from seq
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.op}: {len(self.old2new)} files, {len(self)} operations ' \
+               f'in {len(self.chains)} chains, {len(self.overwrites)} overwrites)'
+
+    def run(self, workers=None, progress=False):
+        """
+        workers : Run independent chains in a thread pool of this size, if given
+        progress: True to print the progress, or Callable(done, total)
+        """
+        total = len(self)
+        report = _progress_printer if progress is True else progress or None
+        done = 0
+        lock = threading.Lock()
+
+        def run_chain(seq):
+            nonlocal done
+            for func, src, dst in seq:
+                func(src, dst)
+                if report is not None:
+                    with lock:
+                        done += 1
+                        report(done, total)
+
+        if workers is None or workers <= 1:
+            for seq in self.chains:
+                run_chain(seq)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(workers) as executor:
+                for future in [executor.submit(run_chain, seq) for seq in self.chains]:
+                    future.result()
+        return self
+
 
-    old2new = {}
-    kwargs = explore(old_template)
-    length = len(next(iter(kwargs.values())))
-    for i in range(length):
-        kw = {k: vs[i] for k, vs in kwargs.items()}
-        old_path = SubPath(old).s(**kw)
-        new_path = SubPath(new).s(parent=parent, **key(kw))
-        old2new[old_path] = new_path
-    return old2new
+def _progress_printer(done, total):
+    if done == total or done % max(total // 100, 1) == 0:
+        print(f'\r  {done}/{total} ({done/total:.0%})', end='\n' if done == total else '', flush=True)
 
 
-def _rename_all(old2new):
-    for old, new in old2new.items():
-        old.rename(new)
+def _move(src, dst):
+    os.replace(src, dst)
 
 
-def _copy_all(old2new):
-    for old, new in old2new.items():
-        _copy(old, new)
+def _copy_file(src, dst):
+    """shutil.copy, but through os.copy_file_range where available, i.e. in-kernel and server-side on NFS"""
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0 and (n := os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)):
+                    remaining -= n
+            shutil.copymode(src, dst)
+            return dst
+        except OSError as e:
+            if e.errno not in _NO_COPY_FILE_RANGE:
+                raise
+    return shutil.copy(src, dst)
+
+
+_NO_COPY_FILE_RANGE = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ETXTBSY}
 
 
 class SubStr:
@@ -133,78 +276,189 @@ class SubStr:
 
     def __init__(self, template):
         self.template = template
-        self.a_keys = tuple(self.a.findall(template))
-        self.b_keys = tuple(self.b.findall(template))
-        self.c_keys, self.c_fmts = zip(*x) if (x := self.c.findall(template)) else ((), ())
-        self.c_dict = {key: fmt for key, fmt in zip(self.c_keys, self.c_fmts)}
-        self.keys = {*self.a_keys, *self.b_keys, *self.c_keys}
+        self._compiled = compiled = _compile(template)
+        self.a_keys = compiled.a_keys
+        self.b_keys = compiled.b_keys
+        self.c_keys, self.c_fmts = compiled.c_keys, compiled.c_fmts
+        self.c_dict = compiled.c_dict
+        self.keys = compiled.keys
 
     def __repr__(self):
         return f"{type(self).__name__}('{self.template}')"
 
     def ambiguous(self, **kwargs):
-        return self.keys.difference(self._lazy | kwargs)
+        return self.keys.difference(self._lazy, kwargs)
 
     def ss(self, **kwargs):
-        def ab_convert(x):
-            key = x.group('key')
-            val = kwargs.get(key, x.group())
-            return str(val)
-
-        def c_convert(x):
-            key, fmt = x.groups()
-            if key in kwargs:
-                val = kwargs[key]
-                return f'{val:{fmt}}'
-            else:
-                return x.group()
-
-        template = self.a.sub(ab_convert, self.template)
-        template = self.b.sub(ab_convert, template)
-        template = self.c.sub(c_convert, template)
-        return type(self)(template)
+        return type(self)(self._compiled.partial(kwargs))
 
     def lazy_substitute(self):
-        def ab_convert(x):
-            key = x.group('key')
-            if key == 'strftime':
-                return datetime.now().strftime('%Y-%m-%d %X')
-            val = self._lazy.get(key, x.group())
-            return str(val)
-
-        def c_convert(x):
-            key, fmt = x.groups()
-            if key not in self._lazy:
-                return x.group()
-            elif key == 'strftime':
-                return datetime.now().strftime(fmt)
-            else:
-                val = self._lazy[key]
-                return f'{val:{fmt}}'
+        return type(self)(self._compiled.partial(self._lazy_values({})))
 
-        template = self.a.sub(ab_convert, self.template)
-        template = self.b.sub(ab_convert, template)
-        template = self.c.sub(c_convert, template)
-        return type(self)(template)
+    def _lazy_values(self, kwargs):
+        return {key: _Strftime() if key == 'strftime' else self._lazy[key]
+                for key in self.keys.intersection(self._lazy).difference(kwargs)}
 
     def s(self, **kwargs):
         if left := self.ambiguous(**kwargs):
             raise KeyError(f'{", ".join(map(str, left))} not provided.\nUse .ss() if necessary.')
-        x = self.ss(**kwargs)
-        x = x.lazy_substitute()
-        if not x.ambiguous():
-            return self.base_cls(x.template)
-        raise KeyError(f'Something went wrong... Never supposed to be triggered...\nPlease report this to wjkim.\n{x}')
+        if lazy := self._lazy_values(kwargs):
+            kwargs |= lazy
+        return self.base_cls(self._compiled.render(kwargs))
 
     def p(self, **kwargs):
         print(self.s(**kwargs))
 
 
+class _Strftime:
+    """Value of the lazy `strftime` key, i.e. `$strftime` or `${strftime:%Y%m%d}`."""
+    def __init__(self):
+        self.now = datetime.now()
+
+    def __str__(self):
+        return self.now.strftime('%Y-%m-%d %X')
+
+    def __format__(self, fmt):
+        return self.now.strftime(fmt)
+
+
+_placeholder = re.compile(r'\$?{(?P<ckey>[_a-z][_a-z0-9]*):(?P<fmt>.*?)}'  # {key:fmt} or ${key:fmt}
+                          r'|\$?{(?P<bkey>[_a-z][_a-z0-9]*)}'  # {key} or ${key}
+                          r'|\$(?P<akey>[_a-z][_a-z0-9]*)',  # $key
+                          flags=re.I)
+
+
+class _Template:
+    """
+    SubStr.template parsed once into literals and placeholders.
+
+    segments: literal `str` or `(key, fmt, raw)` for each placeholder, where fmt is None for $key, {key} and ${key}
+    fmt_str : the same template as a `str.format_map` string, e.g. '/rsrc/{ntype!s}_{cost:.2f}.pkl'
+    """
+    def __init__(self, template):
+        a_keys, b_keys, c_keys, c_fmts = [], [], [], []
+        segments, fields = [], []
+        pos = 0
+        for match in _placeholder.finditer(template):
+            if literal := template[pos:match.start()]:
+                segments.append(literal)
+                fields.append(literal.replace('{', '{{').replace('}', '}}'))
+            pos = match.end()
+
+            if key := match.group('ckey'):
+                fmt = match.group('fmt')
+                c_keys.append(key)
+                c_fmts.append(fmt)
+                fields.append(f'{{{key}:{fmt}}}')
+            else:
+                key, fmt = match.group('bkey'), None
+                if key:
+                    b_keys.append(key)
+                else:
+                    key = match.group('akey')
+                    a_keys.append(key)
+                fields.append(f'{{{key}!s}}')
+            segments.append((key, fmt, match.group()))
+        if literal := template[pos:]:
+            segments.append(literal)
+            fields.append(literal.replace('{', '{{').replace('}', '}}'))
+
+        self.segments = tuple(segments)
+        self.a_keys, self.b_keys = tuple(a_keys), tuple(b_keys)
+        self.c_keys, self.c_fmts = tuple(c_keys), tuple(c_fmts)
+        self.c_dict = {key: fmt for key, fmt in zip(c_keys, c_fmts)}
+        self.keys = frozenset((*a_keys, *b_keys, *c_keys))
+        # A format spec holding `{` would be read as a nested field by str.format
+        self.fmt_str = None if any('{' in fmt for fmt in c_fmts) else ''.join(fields)
+
+    def render(self, kwargs):
+        """Every key must be given"""
+        if self.fmt_str is not None:
+            return self.fmt_str.format_map(kwargs)
+        return self.partial(kwargs)
+
+    def bind(self, names, fixed):
+        """
+        `str.format` string taking the values of `names` positionally, with the other keys taken from `fixed`.
+        None if a format spec cannot be expressed in `str.format`.
+        """
+        if self.fmt_str is None:
+            return None
+        fields = []
+        for seg in self.segments:
+            if isinstance(seg, str):
+                fields.append(seg.replace('{', '{{').replace('}', '}}'))
+                continue
+            key, fmt, _ = seg
+            if key in names:
+                idx = names.index(key)
+                fields.append(f'{{{idx}!s}}' if fmt is None else f'{{{idx}:{fmt}}}')
+            else:
+                val = str(fixed[key]) if fmt is None else format(fixed[key], fmt)
+                fields.append(val.replace('{', '{{').replace('}', '}}'))
+        return ''.join(fields)
+
+    def partial(self, kwargs):
+        """Keys not given are left as they are"""
+        out = []
+        for seg in self.segments:
+            if isinstance(seg, str):
+                out.append(seg)
+                continue
+            key, fmt, raw = seg
+            if key not in kwargs:
+                out.append(raw)
+            elif fmt is None:
+                out.append(str(kwargs[key]))
+            else:
+                out.append(format(kwargs[key], fmt))
+        return ''.join(out)
+
+
+@lru_cache(maxsize=1024)
+def _compile(template: str):
+    return _Template(template)
+
+
 def _mkdir_parent(sp):
     if not sp.parent.is_dir() and sp != sp.parent:  # sp == sp.parent if sp is '/'
         print(f'wjkim_Warning: Directory {sp.parent.absolute()} not found.')
         print(f'  Creating {sp.parent.absolute()}  - by mkdir=True')
-        sp.parent.mkdir(parents=True)
+        sp.parent.mkdir(parents=True, exist_ok=True)  # Possibly by another dump at the same time
+
+
+def _mkdir_parents(paths: Iterable[str]):
+    """_mkdir_parent() for many paths, with a single stat/mkdir per distinct directory"""
+    for directory in sorted({os.path.dirname(path) for path in paths}):
+        if directory and not os.path.isdir(directory):
+            print(f'wjkim_Warning: Directory {os.path.abspath(directory)} not found.')
+            print(f'  Creating {os.path.abspath(directory)}  - by mkdir=True')
+            os.makedirs(directory, exist_ok=True)
+
+
+def _grid_rows(grid, keys=None):
+    """
+    Turn `grid` into (names, rows), where each row is a tuple of values for `names`.
+
+    grid: Mapping of key -> column (list, np.ndarray, ...), all with the same length
+          Iterable of kwargs dicts, all sharing the keys of the first one
+          Iterable of value tuples, e.g. itertools.product(...), named by `keys`
+    """
+    if isinstance(grid, Mapping):
+        names = tuple(grid)
+        return names, zip(*grid.values())
+    if keys is not None:
+        names = tuple(keys)
+        return names, (tuple(row) for row in grid)
+
+    grid = iter(grid)
+    if (first := next(grid, None)) is None:
+        return (), iter(())
+    if not isinstance(first, Mapping):
+        raise TypeError(f'keys must be given unless grid consists of dicts: {first}')
+    names = tuple(first)
+    getter = itemgetter(*names) if len(names) > 1 else lambda row: tuple(row[key] for key in names)
+    return names, map(getter, chain([first], grid))
 
 
 def _resolve_env_vars(x):
@@ -237,14 +491,12 @@ def _find_json_path():
         return default_path
 
 
-def _fillout_constants():
+def _fillout_constants(json_path=None):
     # Find `wjkim_config.json`
-    if json_path := _find_json_path():
-        with open(json_path, 'r') as file:
-            dct = json.load(file)
-        res_dct = {k: _resolve_env_vars(v) for k, v in dct.items()}
+    if json_path := json_path or _find_json_path():
+        res_dct = _load_json_constants(json_path)
         print(f'{json_path} used for wjkim.pathlib')
-        return res_dct    
+        return res_dct
 
     # Find `PROJ_DIR` environment variable
     base_dir = os.environ.get('PROJ_DIR', None)
@@ -269,9 +521,116 @@ def _fillout_constants():
     return default
 
 
+def _load_json_constants(json_path):
+    """
+    `wjkim_config.json` with its $VAR resolved, through a cache of the resolved values.
+    The cache is valid while the mtime and size of the json file and every $VAR it refers to stay the same,
+    so that a pool of workers does not re-parse and re-resolve it one by one.
+    """
+    stat = os.stat(json_path)
+    cache_path = _constants_cache_path(json_path)
+    try:
+        with open(cache_path, 'r') as file:
+            cache = json.load(file)
+        if cache['stat'] == [stat.st_mtime_ns, stat.st_size] and \
+                all(os.environ.get(key) == v for key, v in cache['env'].items()):
+            return cache['constants']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with open(json_path, 'r') as file:
+        dct = json.load(file)
+    res_dct = {k: _resolve_env_vars(v) for k, v in dct.items()}
+
+    env = {key: os.environ.get(key) for v in dct.values() for key in SubStr(v).keys}
+    cache = dict(stat=[stat.st_mtime_ns, stat.st_size], env=env, constants=res_dct)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f'{cache_path.name}.{os.getpid()}')
+        with open(tmp_path, 'w') as file:
+            json.dump(cache, file)
+        os.replace(tmp_path, cache_path)  # Atomic, as many workers may write at once
+    except OSError:
+        pass
+    return res_dct
+
+
+def _constants_cache_path(json_path):
+    name = os.path.abspath(json_path).replace(os.sep, '%')
+    return _Path(os.environ.get('XDG_CACHE_HOME') or _Path.home()/'.cache')/'wjkim'/'constants'/name
+
+
+class Constants:
+    """
+    Registry of the project constants of SubPath, e.g. `$rsrc` of '$rsrc/x.pkl', filled out on first use.
+
+        constants.get()                        # {'rsrc': ..., ...}, the same as SubPath._constants
+        constants.load('/path/to/wjkim_config.json')
+        constants.reload()                     # Re-read after wjkim_config.json or the environment changed
+        with constants.override(rsrc='/scratch/rsrc'):
+            wj.s('$rsrc/x.pkl')                # /scratch/rsrc/x.pkl
+
+    A forked worker inherits the loaded constants, and can load() or override() its own without re-importing.
+    """
+    def __init__(self):
+        self._json_path = None
+        self._base = None
+        self._overrides = []
+        self._value = None
+        self._lock = threading.RLock()
+
+    def __get__(self, obj, objtype=None):
+        if (value := self._value) is None:
+            value = self.get()
+        return value
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.get()})'
+
+    def get(self):
+        with self._lock:
+            if self._base is None:
+                self._base = _fillout_constants(self._json_path)
+                self._refresh()
+            return self._value
+
+    def load(self, json_path=None):
+        """Load from `json_path`, or else from `WJKIM_CONFIG_PATH`, `$HOME/bin/others/wjkim_config.json` or `PROJ_DIR`"""
+        with self._lock:
+            self._json_path = json_path
+            self._base = _fillout_constants(json_path)
+            self._refresh()
+            return self._value
+
+    def reload(self):
+        return self.load(self._json_path)
+
+    @contextmanager
+    def override(self, **kwargs):
+        with self._lock:
+            self.get()
+            self._overrides.append(kwargs)
+            self._refresh()
+        try:
+            yield self._value
+        finally:
+            with self._lock:
+                self._overrides.remove(kwargs)
+                self._refresh()
+
+    def _refresh(self):
+        value = dict(self._base)
+        for overrides in self._overrides:
+            value |= overrides
+        self._value = value
+
+
+constants = Constants()
+
+
 class SubPath(SubStr):
     base_cls = _Path
-    _constants = _fillout_constants()
+    _constants = constants
     _restricted = {'mkdir', 'mode', 'buffering', 'encoding', 'errors', 'newline', 'closefd', 'opener'}
 
     def __init__(self, *args, **kwargs):
@@ -282,7 +641,7 @@ class SubPath(SubStr):
             raise ValueError(msg)
 
     def ambiguous(self, **kwargs):
-        return self.keys.difference(self._lazy | self._constants | kwargs)
+        return self.keys.difference(self._lazy, self._constants, kwargs)
 
     def as_str(self, **kwargs):
         semi_final = str(self.s(**kwargs))
@@ -296,6 +655,33 @@ class SubPath(SubStr):
             _mkdir_parent(sp)
         return sp
 
+    def s_many(self, grid, *, keys=None, as_str=False, mkdir=False, **kwargs):
+        """
+        Resolve a whole grid of paths at once, see _grid_rows() for the accepted forms of `grid`.
+        Values shared by every path can be given as **kwargs, as in .s().
+
+            SubPath('$rsrc/${ntype}_${cost:.2f}.pkl').s_many([dict(ntype='BA', cost=0.5), ...])
+            SubPath('$rsrc/${ntype}_${cost:.2f}.pkl').s_many(dict(ntype=ntypes, cost=costs))
+            SubPath('$rsrc/${ntype}_${cost:.2f}.pkl').s_many(product(ntypes, costs), keys=('ntype', 'cost'))
+
+        The template is parsed and the constants are merged only once, and
+        mkdir=True creates each parent directory only once.
+        """
+        names, rows = _grid_rows(grid, keys=keys)
+        fixed = self._constants | kwargs
+        if left := self.keys.difference(self._lazy, fixed, names):
+            raise KeyError(f'{", ".join(map(str, left))} not provided.\nUse .ss() if necessary.')
+        fixed |= self._lazy_values(fixed)
+
+        if (fmt := self._compiled.bind(names, fixed)) is not None:
+            res = [fmt.format(*row) for row in rows]
+        else:
+            res = [self._compiled.render(fixed | dict(zip(names, row))) for row in rows]
+
+        if mkdir:
+            _mkdir_parents(res)
+        return res if as_str else [self.base_cls(x) for x in res]
+
     def ss(self, **kwargs):
         kwargs = self._constants | kwargs
         return super().ss(**kwargs)
@@ -317,27 +703,26 @@ class SubPath(SubStr):
 
     def glob(self, **kwargs):
         """Equivalent to bash `ls -d` when `shopt -s globstar` enabled."""
-        temp = self.ss(**kwargs)
-        final = temp.ss(**{key: '*' for key in temp.keys})
-        if left := final.ambiguous():
-            raise KeyError(f'{", ".join(map(str, left))} not provided.\n')
-        raw = _glob(final.as_str(), recursive=True)
-        return [self.base_cls(x) for x in sorted(sorted(raw, key=lambda x: (x.count('/'))))]
-
-    def explore(self, *targets):
-        new = self.ss()
-        kwargs = {key: fr'(?P<{key}>[\w.-]+)' for key in new.keys}
-        pattern = new.as_str(**kwargs)
-        pattern = _interpret_wildcards(pattern, new.keys)
-
-        filenames = new.glob()
+        return [self.base_cls(path) for path in sorted(path for path, _ in self._scan(**kwargs))]
+
+    def explore(self, *targets, as_array=False, dtypes=None):
+        """
+        Values of each key (and wildcard) over the files found, as {key: [str, ...]}.
+
+        as_array=True  : NumPy structured array instead, with fields typed by `dtypes` or else by the format spec,
+                         e.g. float for ${cost:.2f} and int for ${trial:03d}, and str for the rest.
+        as_array='dict': {key: np.ndarray} typed likewise
+        See also unique_combinations() and missing_grid_points().
+        """
         res = {}
-        for filename in filenames:
-            if match := re.match(pattern, str(filename)):
-                for key, v in match.groupdict().items():
-                    res.setdefault(key, []).append(v)
-            else:
-                raise ValueError(f'wj.glob and wj.explore does not match for {self.template}.\n  Please report this to wjkim!')
+        for _, kw in sorted(self._scan(), key=lambda x: x[0]):
+            for key, v in kw.items():
+                res.setdefault(key, []).append(v)
+        if as_array:
+            res = self._as_arrays(res, dtypes or {})
+            if as_array != 'dict':
+                res = _structured(res)
+                return res[targets[0] if len(targets) == 1 else list(targets)] if targets else res
 
         if not targets:
             return res
@@ -345,51 +730,368 @@ class SubPath(SubStr):
             return res[targets[0]]
         return {target: res[target] for target in targets}
 
+    def _as_arrays(self, res, dtypes):
+        import numpy as np
+        if not res:
+            res = {key: [] for key in self.ss().keys}
+        return {key: np.asarray(vs, dtype=str).astype(dtypes.get(key, _infer_dtype(self.c_dict.get(key))))
+                for key, vs in res.items()}
 
-def _interpret_wildcards(x, keys):
-    x0 = x
+    def scan(self, **kwargs):
+        """
+        Single pass over the file system behind both .glob() and .explore(), yielding (path, kw) as found, unsorted.
 
-    # replace `.` with `\.` to avoid misinterpretation with re
-    x = x.replace('.', r'\.')
-    x1 = x
+        Keys left after substituting `kwargs` act as `*` and are captured into `kw`, and so are the wildcards,
+        as `__DSTAR{i}__` for `**`, `__STAR{i}__` for `*` and `__QUESTION{i}__` for `?`, numbered from the left.
+        Literal path components are never listed, so only the directories that can match are visited.
+        """
+        for path, kw in self._scan(**kwargs):
+            yield self.base_cls(path), kw
 
-    # replace `?` with `(?P<__QUESTION{i}__>[^/])`
-    for i in range(len(re.findall(r'(?<!\()\?|\?(?!P)', x))):
-        assert f'__QUESTION{i}__' not in keys, f'__QUESTION{i}__ cannot be used'
-        x = re.sub(r'(?<!\()\?|\?(?!P)', rf'(?P<__QUESTION{i}__>[\\w.-])', x, count=1)
-    x2 = x
+    def _scan(self, **kwargs):
+        template = self.ss(**kwargs).template
+        return _scan(_parse_parts(template), 0, '/' if template.startswith('/') else '', {})
 
-    # replace `*`
-    i = -1
-    j = -1
-    for _ in range(x.count('/**')):
-        i += 1
-        assert f'__DSTAR{i}__' not in keys, f'__DSTAR{i}__ cannot be used'
-        x = x.replace('/**', rf'/?(?P<__DSTAR{i}__>.*)', 1)
-    x3 = x
-    for _ in range(x.count('**/*')):
-        i += 1
-        j += 1
-        assert f'__DSTAR{i}__' not in keys, f'__DSTAR{i}__ cannot be used'
-        assert f'__STAR{j}__' not in keys, f'__STAR{j}__ cannot be used'
-        x = x.replace('**/*', rf'(?P<__DSTAR{i}__>.*?)/?(?P<__STAR{j}__>[^/]*)', 1)
-        # x = x.replace('**/*', rf'(?P<__DSTAR{i}__>.*)/?', 1)
-    x4 = x
-    for _ in range(x.count('**/')):
-        i += 1
-        assert f'__DSTAR{i}__' not in keys, f'__DSTAR{i}__ cannot be used'
-        x = x.replace('**/', rf'(?P<__DSTAR{i}__>.*)/?', 1)
-    x5 = x
-    for _ in range(x.count('**')):
+
+def _infer_dtype(fmt):
+    """dtype of values written by format spec `fmt`"""
+    if fmt and fmt[-1] in 'eEfFgG':
+        return float
+    if fmt and fmt[-1] in 'dn':
+        return int
+    return str
+
+
+def _structured(columns):
+    import numpy as np
+    arr = np.empty(len(next(iter(columns.values()), ())), dtype=[(key, col.dtype) for key, col in columns.items()])
+    for key, col in columns.items():
+        arr[key] = col
+    return arr
+
+
+def unique_combinations(arr, *keys):
+    """
+    Distinct rows of structured array `arr` over `keys` (all fields if not given), sorted.
+
+        unique_combinations(explore('$data/${ntype}_${cost:.2f}_${trial}.pkl', as_array=True), 'ntype', 'cost')
+    """
+    import numpy as np
+    from numpy.lib.recfunctions import repack_fields
+    return np.unique(repack_fields(arr[list(keys)]) if keys else arr)
+
+
+def missing_grid_points(arr, *keys, **axes):
+    """
+    Points of the full grid over `keys` not found in structured array `arr`, as a structured array.
+    The values along each axis are the unique ones in `arr`, unless given by `axes`.
+    Floats are compared with np.isclose, as values parsed back from e.g. ${cost:.2f} are rounded.
+
+        missing_grid_points(arr, 'ntype', cost=np.arange(0, 1, 0.05))
+    """
+    import numpy as np
+    keys = list(dict.fromkeys([*keys, *axes])) or list(arr.dtype.names)
+    axes = {key: np.unique(arr[key] if axes.get(key) is None else np.asarray(axes[key])) for key in keys}
+
+    present = np.zeros([len(axes[key]) for key in keys], dtype=bool)
+    indices, found = [], np.ones(len(arr), dtype=bool)
+    for key in keys:
+        axis, col = axes[key], arr[key]
+        if not len(axis):  # No grid at all, e.g. over the values in `arr` while nothing is found yet
+            return _structured({key: axes[key][:0] for key in keys})
+        idx = np.searchsorted(axis, col).clip(0, len(axis) - 1)
+        if np.issubdtype(axis.dtype, np.floating):
+            lower = (idx - 1).clip(0)
+            idx = np.where(np.abs(axis[lower] - col) < np.abs(axis[idx] - col), lower, idx)
+            found &= np.isclose(axis[idx], col)
+        else:
+            found &= axis[idx] == col
+        indices.append(idx)
+    present[tuple(idx[found] for idx in indices)] = True
+
+    missing = np.nonzero(~present)
+    return _structured({key: axes[key][idx] for key, idx in zip(keys, missing)})
+
+
+_LITERAL, _DSTAR, _PATTERN = range(3)
+
+
+@lru_cache(maxsize=256)
+def _parse_parts(template):
+    """
+    Split `template` into path components, each one of
+        (_LITERAL, name)
+        (_DSTAR, group)                    : `**` as a whole component
+        (_PATTERN, regex, matches_hidden)  : Keys and/or wildcards in it
+    A template ending with `/` matches directories only, as glob does.
+    """
+    counts = dict(DSTAR=0, STAR=0, QUESTION=0)
+
+    def count(kind):
+        counts[kind] += 1
+        return f'__{kind}{counts[kind] - 1}__'
+
+    parts = []
+    for component in template.split('/'):
+        if not component:
+            continue
+        if component == '**':
+            parts.append((_DSTAR, count('DSTAR')))
+            continue
+        regex, seen = [], set()
+        for seg in _compile(component).segments:
+            if not isinstance(seg, str):
+                key = seg[0]
+                regex.append(f'(?P={key})' if key in seen else f'(?P<{key}>.*)')
+                seen.add(key)
+            else:
+                regex.append(_translate(seg, count))
+        if not seen and not any(c in component for c in '*?['):
+            parts.append((_LITERAL, component))
+        else:
+            parts.append((_PATTERN, re.compile(''.join(regex), flags=re.S), component.startswith('.')))
+    if template.endswith('/'):
+        parts.append((_LITERAL, ''))
+    return tuple(parts)
+
+
+def _translate(literal, count):
+    """Glob wildcards in `literal` into regex, naming each `**`, `*` and `?` by count()"""
+    out = []
+    i, n = 0, len(literal)
+    while i < n:
+        c = literal[i]
+        if literal.startswith('**', i):
+            out.append(f'(?P<{count("DSTAR")}>[^/]*)')
+            i += 2
+            continue
+        elif c == '*':
+            out.append(f'(?P<{count("STAR")}>[^/]*)')
+        elif c == '?':
+            out.append(f'(?P<{count("QUESTION")}>.)')
+        elif c == '[' and (j := literal.find(']', i + 2)) != -1:
+            stuff = literal[i+1:j].replace('\\', r'\\')
+            if stuff[0] == '!':
+                stuff = '^' + stuff[1:]
+            elif stuff[0] == '^':
+                stuff = '\\' + stuff
+            out.append(f'[{stuff}]')
+            i = j
+        else:
+            out.append(re.escape(c))
         i += 1
-        assert f'__DSTAR{i}__' not in keys, f'__DSTAR{i}__ cannot be used'
-        x = x.replace('**', rf'(?P<__DSTAR{i}__>.*)', 1)
-    x6 = x
-    for _ in range(len(re.findall(r'(?<!>\.|/\])\*|\*(?!\))', x))):
-        j += 1
-        assert f'__STAR{j}__' not in keys, f'__STAR{j}__ cannot be used'
-        x = re.sub(r'(?<!>\.|/\])\*|\*(?!\))', rf'(?P<__STAR{j}__>[^/]*)', x, count=1)
-    x7 = x
+    return ''.join(out)
+
+
+def _scan(parts, i, path, kw):
+    if i == len(parts):
+        if path:  # Not the current directory itself, e.g. for `**`, as glob
+            yield path, kw
+        return
+    last = i == len(parts) - 1
+    kind, *spec = parts[i]
+
+    if kind == _LITERAL:
+        name, = spec
+        sub = os.path.join(path, name)
+        if not name:  # template ends with `/`
+            if os.path.isdir(path):
+                yield sub, kw
+        elif last:
+            if os.path.lexists(sub):
+                yield sub, kw
+        elif os.path.isdir(sub):
+            yield from _scan(parts, i + 1, sub, kw)
+
+    elif kind == _DSTAR:
+        group, = spec
+        dironly = not last
+        for rel in chain([''], _rlistdir(path, dironly)):
+            yield from _scan(parts, i + 1, os.path.join(path, rel), kw | {group: rel})
+
+    else:
+        regex, matches_hidden = spec
+        dironly = not last
+        for name, is_dir in _listdir(path):
+            if (dironly and not is_dir) or (name[0] == '.' and not matches_hidden):
+                continue
+            if match := regex.fullmatch(name):
+                found = match.groupdict()
+                if any(kw.get(key, v) != v for key, v in found.items()):  # Same key, different values
+                    continue
+                yield from _scan(parts, i + 1, os.path.join(path, name), kw | found)
+
+
+def _listdir(path):
+    """[(name, is_dir), ...] of `path`, or [] if not a readable directory"""
+    if _index is not None:
+        return _index.listdir(path)
+    return _scandir(path)
+
+
+def _scandir(path):
+    try:
+        with os.scandir(path or os.curdir) as it:
+            return [(entry.name, _is_dir(entry)) for entry in it]
+    except OSError:
+        return []
+
+
+def _is_dir(entry):
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def _rlistdir(path, dironly):
+    """Every non-hidden descendant of `path`, relative to it, as `**` of glob"""
+    for name, is_dir in _listdir(path):
+        if name[0] == '.' or (dironly and not is_dir):
+            continue
+        yield name
+        if is_dir:
+            for rel in _rlistdir(os.path.join(path, name), dironly):
+                yield os.path.join(name, rel)
+
+
+class DirIndex:
+    """
+    Persistent cache of directory listings for .glob(), .explore() and .scan(), one SQLite file per root.
+    A cached listing is reused as long as the mtime of its directory is unchanged,
+    so repeated scans only list the directories that changed since.
+    A listing taken within _RACY_NS of the mtime is not cached, as a file may still be added within the same tick
+    of a coarse mtime (1 s on NFS) without changing it, e.g. by another worker.
+
+        index = DirIndex().enable()  # roots: directories in SubPath._constants by default
+        index.warm('$data/**')       # optional, fill the index in advance
+        wj.explore('$data/${ntype}/${ntype}_${cost}.pkl')
+        index.info()                 # {'hits': ..., 'misses': ..., 'hit_rate': ..., 'roots': {root: entries}}
+        index.drop()                 # remove the index files
+
+    Index files live in `$XDG_CACHE_HOME/wjkim` (`~/.cache/wjkim` by default), not in the roots themselves,
+    as writing there would change the mtime of the roots on every update.
+    Directories outside every root are listed as usual.
+    """
+    def __init__(self, roots=None, cache_dir=None):
+        if roots is None:
+            roots = [v for v in SubPath._constants.values() if os.path.isdir(v)]
+        roots = sorted({os.path.abspath(root) for root in roots})
+        self.roots = [root for root in roots if not any(root.startswith(other + os.sep) for other in roots)]
+        if cache_dir is None:
+            cache_dir = _Path(os.environ.get('XDG_CACHE_HOME') or _Path.home()/'.cache')/'wjkim'
+        self.cache_dir = _Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+        self._conns = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.roots})"
+
+    def enable(self):
+        global _index
+        _index = self
+        return self
+
+    def disable(self):
+        global _index
+        if _index is self:
+            _index = None
+        return self
+
+    def db_path(self, root):
+        import hashlib
+        digest = hashlib.sha1(root.encode()).hexdigest()[:16]
+        return self.cache_dir / f'index_{_Path(root).name}_{digest}.sqlite'
+
+    def _root_of(self, path):
+        for root in self.roots:
+            if path == root or path.startswith(root + os.sep):
+                return root
+
+    def _connect(self, root):
+        if self._pid != os.getpid():  # Connections must not be shared with a forked child
+            self._conns, self._pid = {}, os.getpid()
+            self._lock = threading.Lock()
+        if (conn := self._conns.get(root)) is None:
+            import sqlite3
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path(root), timeout=60, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('CREATE TABLE IF NOT EXISTS listings (dir TEXT PRIMARY KEY, mtime_ns INTEGER, listing TEXT)')
+            self._conns[root] = conn
+        return conn
+
+    def listdir(self, path):
+        abspath = os.path.abspath(path or os.curdir)
+        if (root := self._root_of(abspath)) is None:
+            return _scandir(path)
+        try:
+            mtime_ns = os.stat(abspath).st_mtime_ns
+        except OSError:
+            return []
+
+        with self._lock:
+            conn = self._connect(root)
+            row = conn.execute('SELECT mtime_ns, listing FROM listings WHERE dir = ?', (abspath,)).fetchone()
+            if row is not None and row[0] == mtime_ns:
+                self.hits += 1
+                return _decode_listing(row[1])
+            self.misses += 1
+
+        listing = _scandir(path)  # Listed after stat, so a concurrent change is caught next time
+        if time.time_ns() - mtime_ns < _RACY_NS:
+            return listing
+        with self._lock:
+            conn.execute('INSERT OR REPLACE INTO listings VALUES (?, ?, ?)', (abspath, mtime_ns, _encode_listing(listing)))
+        return listing
+
+    def warm(self, x, **kwargs):
+        """Scan `x` through this index, returning the number of paths found"""
+        global _index
+        prev, _index = _index, self
+        try:
+            return sum(1 for _ in SubPath(x).scan(**kwargs))
+        finally:
+            _index = prev
+
+    def info(self):
+        total = self.hits + self.misses
+        roots = {}
+        for root in self.roots:
+            if self.db_path(root).is_file():
+                with self._lock:
+                    roots[root] = self._connect(root).execute('SELECT COUNT(*) FROM listings').fetchone()[0]
+            else:
+                roots[root] = 0
+        return dict(hits=self.hits, misses=self.misses, hit_rate=self.hits/total if total else None, roots=roots)
+
+    def reset_stats(self):
+        self.hits = self.misses = 0
+
+    def drop(self, root=None):
+        """Remove the index file of `root`, or of every root if not given"""
+        roots = self.roots if root is None else [os.path.abspath(root)]
+        with self._lock:
+            for root in roots:
+                if (conn := self._conns.pop(root, None)) is not None:
+                    conn.close()
+                for suffix in ['', '-journal', '-wal', '-shm']:
+                    path = self.db_path(root)
+                    path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+_RACY_NS = 2 * 10**9
+
+
+def _encode_listing(listing):
+    return '\0'.join(name + '/' if is_dir else name for name, is_dir in listing)  # `/` cannot be in a name
+
+
+def _decode_listing(x):
+    return [(name[:-1], True) if name[-1] == '/' else (name, False) for name in x.split('\0')] if x else []
 
-    return '^' + x + '$'
 
+_index: DirIndex | None = None
@@ -1,36 +1,550 @@
+import io
+import os
+import gzip
+import hashlib
+import json
+import lzma
+import mmap
+import time
+import zlib
+import pickle
+import threading
+from queue import Queue
 import tarfile as _tarfile
+from bisect import bisect_right
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from tempfile import SpooledTemporaryFile
+from contextlib import contextmanager
 from collections.abc import Iterable
-from functools import cached_property
+from functools import cached_property, partial
 from pathlib import Path
 from .pathlib import s
 
+try:
+    import zstandard as _zstd
+except ImportError:
+    _zstd = None
 
-def tar(tar_name, mode='r', keep=False):
+
+def tar(tar_name, mode='r', keep=False, view=False, compression=None, workers=None, background=False, dedup=False):
+    """
+    mode: 'r', 'w' or 'a', where 'w:gz', 'w:xz' or 'w:zst' is the same as compression='gz', 'xz' or 'zst'
+    workers: threads (de)compressing the blocks of a compressed archive, os.cpu_count() if None
+    """
+    mode, _, suffix = mode.partition(':')
+    assert mode in ['r', 'w', 'a']
+    tar_path = s(tar_name)
+    if mode == 'r':  # Compression is detected
+        return TarRead(tar_path, view=view, workers=workers)
+    return TarWrite(tar_path, mode=mode, keep=keep, compression=compression or suffix or None, workers=workers,
+                    background=background, dedup=dedup)
+
+
+def shards(tar_name, mode='r', keep=False, view=False, max_size=2**30, max_members=None, **kwargs):
+    """
+    Archive split into shards `Name.000.tar`, `Name.001.tar`, ... with a manifest `Name.tar.manifest.json`,
+    e.g. shards('$rsrc/Name.tar', 'a'), rolling over to a new shard at `max_size` bytes or `max_members` members.
+    mode='a' always starts a new shard, so the shards written before are never touched again.
+    kwargs: compression, workers, background, dedup as for tar(), dedup within each shard
+    """
+    mode, _, suffix = mode.partition(':')
     assert mode in ['r', 'w', 'a']
     tar_path = s(tar_name)
     if mode == 'r':
-        return TarRead(tar_path, mode=mode)
-    return TarWrite(tar_path, mode=mode, keep=keep)
+        return ShardRead(tar_path, view=view, workers=kwargs.get('workers'))
+    if suffix:
+        kwargs['compression'] = suffix
+    return ShardWrite(tar_path, mode=mode, keep=keep, max_size=max_size, max_members=max_members, **kwargs)
+
+
+class TarIndex:
+    """
+    Sidecar `<tar>.idx` recording where the data of each member lies in an uncompressed tar,
+    so that a member can be read directly, without scanning the header chain of the archive.
+    Written by TarWrite and, if missing or stale, by TarRead after its scan.
+    It is stamped by the size of the tar and a checksum of its head and tail, not by its mtime,
+    so that it stays valid for a copy of the tar, e.g. by cp or rsync without -t.
+
+    members: [[name, offset, size], ...] in archive order, offset and size None unless a regular file,
+        or a hard link to one, e.g. written by TarWrite(dedup=True), given the offset and size of its target
+    blocks, codec: for an archive compressed by TarWrite, see _BlockWriter; offsets are then of the uncompressed tar
+    refs: {name: target} of the hard links
+    digests: {sha256: name} of the members stored by TarWrite(dedup=True)
+    """
+    def __init__(self, members, stat=None, blocks=None, codec=None, refs=None, digests=None):
+        self.members = members
+        self.stat = stat  # _stamp() of the tar when indexed
+        self.blocks = blocks
+        self.codec = codec
+        self.refs = refs or {}
+        self.digests = digests
+        self.lookup = {name: (offset, size) for name, offset, size in members}  # The last one wins, as getmember()
+
+    @staticmethod
+    def path_of(tar_path: Path):
+        return tar_path.with_name(tar_path.name + '.idx')
+
+    @classmethod
+    def from_tarinfos(cls, tarinfos: Iterable[_tarfile.TarInfo], direct=True):
+        """direct=False: offsets are left None, e.g. for compressed archives"""
+        index = cls([])
+        for info in tarinfos:
+            index.append(info, info.offset_data if direct else None)
+        return index
+
+    def append(self, info: _tarfile.TarInfo, offset_data):
+        if offset_data is not None and info.isreg() and not info.issparse():
+            where = (offset_data, info.size)
+        elif info.islnk() and info.linkname in self.lookup:  # To the last one before, as TarFile
+            where = self.lookup[info.linkname]
+            self.refs[info.name] = info.linkname
+        else:
+            where = (None, None)
+        self.members.append([info.name, *where])
+        self.lookup[info.name] = where
+
+    @classmethod
+    def load(cls, tar_path: Path):
+        """None if missing or stale"""
+        try:
+            with open(cls.path_of(tar_path), 'r') as file:
+                dct = json.load(file)
+            if dct['stat'] == _stamp(tar_path):
+                return cls(dct['members'], stat=dct['stat'], blocks=dct.get('blocks'), codec=dct.get('codec'),
+                           refs=dct.get('refs'), digests=dct.get('digests'))
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def save(self, tar_path: Path):
+        """Stamped with the current _stamp() of `tar_path`; silently skipped if not writable"""
+        self.stat = _stamp(tar_path)
+        path = self.path_of(tar_path)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}')
+        try:
+            with open(tmp_path, 'w') as file:
+                dct = dict(stat=self.stat, members=self.members)
+                if self.blocks is not None:
+                    dct.update(blocks=self.blocks, codec=self.codec)
+                if self.refs:
+                    dct.update(refs=self.refs)
+                if self.digests is not None:
+                    dct.update(digests=self.digests)
+                json.dump(dct, file)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+def _new_tarinfo(mem_name, size):
+    info = _tarfile.TarInfo(mem_name)
+    info.size = size
+    info.mtime = time.time()
+    info.mode = 0o644
+    return info
+
+
+def _compressed(path):
+    with open(path, 'rb') as file:
+        head = file.read(6)
+    return any(head.startswith(magic) for magic in _MAGICS)
+
+
+_MAGICS = [b'\x1f\x8b', b'BZh', b'\xfd7zXZ\x00', b'\x28\xb5\x2f\xfd']  # gzip, bz2, xz, zstd
+
+
+def _sha256(fileobj):
+    digest = hashlib.sha256()
+    for chunk in iter(partial(fileobj.read, 2**20), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _stamp(path, span=2**16):
+    """[size, sha256 of the first and last `span` bytes] of the file at `path`"""
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        digest = hashlib.sha256(file.read(span))
+        if size > span:
+            digest.update(os.pread(file.fileno(), span, max(size - span, span)))
+    return [size, digest.hexdigest()[:16]]
+
+
+_CODECS = {  # name: (compress(data, level), decompress(data)), each call on a whole block
+    'gz': (lambda data, level: gzip.compress(data, 6 if level is None else level, mtime=0),
+           gzip.decompress),
+    'xz': (lambda data, level: lzma.compress(data, preset=6 if level is None else level),
+           lzma.decompress),
+    'zst': (lambda data, level: _zstd.ZstdCompressor(level=3 if level is None else level).compress(data),
+            lambda data: _zstd.ZstdDecompressor().decompress(data)),
+}
+_ALIASES = {'gzip': 'gz', 'lzma': 'xz', 'zstd': 'zst'}
+_BLOCK_SIZE = 2**20
+
+
+def _codec(compression):
+    codec = _ALIASES.get(compression, compression)
+    if codec not in _CODECS:
+        raise ValueError(f'Unknown compression: {compression}, not one of {list(_CODECS)}')
+    if codec == 'zst' and _zstd is None:
+        raise ImportError('zstd compression requires zstandard: pip install zstandard')
+    return codec
+
+
+class _BlockWriter(io.RawIOBase):
+    """
+    Write-only file compressing what is written in independent blocks of `block_size` on a thread pool, pigz-style.
+    Each block is a whole gzip member/xz stream/zstd frame, so the result is still an ordinary .tar.gz/.xz/.zst,
+    while `blocks` records where each one lies, for _BlockReader:
+        [[offset, size, comp_offset, comp_size], ...]
+    Kept in TarIndex, and recovered by _scan_blocks() without it. Note that the stdlib reads .tar.zst only from
+    Python 3.14 on, so elsewhere TarRead (with zstandard installed) is the way to read it.
+    """
+    def __init__(self, raw, codec, workers=None, level=None, block_size=_BLOCK_SIZE):
+        super().__init__()
+        self.raw = raw
+        self.compress = partial(_CODECS[codec][0], level=level)
+        self.block_size = block_size
+        self.workers = workers or os.cpu_count()
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.buffer = bytearray()
+        self.pending = deque()  # (offset, size, Future[bytes]) in order
+        self.pos = 0  # Written
+        self.submitted = 0
+        self.comp_pos = 0
+        self.blocks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        n = memoryview(b).nbytes
+        self.buffer += b
+        self.pos += n
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return n
+
+    def tell(self):
+        return self.pos
+
+    def _submit(self, data):
+        self.pending.append((self.submitted, len(data), self.executor.submit(self.compress, data)))
+        self.submitted += len(data)
+        while len(self.pending) > 2 * self.workers:  # Bounds the memory held
+            self._write_next()
+
+    def _write_next(self):
+        offset, size, future = self.pending.popleft()
+        data = future.result()
+        self.raw.write(data)
+        self.blocks.append([offset, size, self.comp_pos, len(data)])
+        self.comp_pos += len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.buffer:
+                self._submit(bytes(self.buffer))
+                self.buffer.clear()
+            while self.pending:
+                self._write_next()
+        finally:
+            self.executor.shutdown()
+            self.raw.close()
+            super().close()
+
+
+_MAX_BLOCK_SIZE = 64 * _BLOCK_SIZE  # Beyond which a block is not decompressed as a whole, see _scan_blocks()
+_MAGIC_CODECS = {b'\x1f\x8b': 'gz', b'\xfd7zXZ\x00': 'xz', b'\x28\xb5\x2f\xfd': 'zst'}
+
+
+def _codec_of(fd):
+    """Codec of _CODECS the archive is compressed with, None if uncompressed or else, e.g. bz2"""
+    head = os.pread(fd, 6, 0)
+    return next((codec for magic, codec in _MAGIC_CODECS.items() if head.startswith(magic)), None)
+
+
+def _decompressor(codec):
+    if codec == 'gz':
+        return zlib.decompressobj(wbits=31)
+    elif codec == 'xz':
+        return lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+    if _zstd is None:
+        raise ImportError('Reading a .tar.zst requires zstandard: pip install zstandard')
+    return _zstd.ZstdDecompressor().decompressobj()
+
+
+def _scan_blocks(fd, codec, chunk_size=2**16):
+    """
+    Blocks of _BlockWriter, i.e. the gzip members/xz streams/zstd frames, found by decompressing the archive once,
+    for an archive whose TarIndex is missing or stale. None if a gz/xz one is larger than _MAX_BLOCK_SIZE,
+    e.g. written by the stdlib as a single stream, which is then better read as a stream; not so for zst,
+    which the stdlib may not read at all.
+    """
+    blocks = []
+    offset = comp_offset = pos = size = 0
+    dec = None
+    while data := os.pread(fd, chunk_size, pos):
+        pos += len(data)
+        while data:
+            if dec is None:
+                dec = _decompressor(codec)
+            size += len(dec.decompress(data))
+            if codec != 'zst' and size > _MAX_BLOCK_SIZE:
+                return None
+            if not dec.eof:
+                break
+            data = dec.unused_data
+            comp_size = pos - len(data) - comp_offset
+            blocks.append([offset, size, comp_offset, comp_size])
+            offset, comp_offset, size, dec = offset + size, comp_offset + comp_size, 0, None
+    if dec is not None:
+        raise EOFError(f'Compressed archive ended unexpectedly at {pos} bytes')
+    return blocks
+
+
+class _BlockReader:
+    """
+    pread() over the uncompressed content of an archive written by _BlockWriter, decompressing its blocks
+    on a thread pool: those a read spans, and `workers` more ahead while reading sequentially
+    """
+    def __init__(self, fd, blocks, codec, workers=None):
+        self.fd = fd
+        self.blocks = blocks
+        self.starts = [offset for offset, _, _, _ in blocks]
+        self.size = blocks[-1][0] + blocks[-1][1] if blocks else 0  # Of the uncompressed tar
+        self.decompress = _CODECS[_codec(codec)][1]
+        self.workers = workers or os.cpu_count()
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.cache = OrderedDict()  # i: Future[bytes], least recently used first
+        self.last = -1
+        self.lock = threading.Lock()
+
+    def pread(self, n, offset):
+        i = bisect_right(self.starts, offset) - 1
+        chunks = []
+        while n > 0 and 0 <= i < len(self.blocks):
+            start = offset - self.blocks[i][0]
+            chunk = self._block(i).result()[start:start+n]
+            if not chunk:
+                break
+            chunks.append(chunk)
+            n -= len(chunk)
+            offset += len(chunk)
+            i += 1
+        return b''.join(chunks)
+
+    def _block(self, i):
+        with self.lock:
+            ahead = self.workers if i in (self.last, self.last + 1) else 0
+            self.last = i
+            for j in range(i, min(i + 1 + ahead, len(self.blocks))):
+                if j not in self.cache:
+                    self.cache[j] = self.executor.submit(self._load, j)
+            future = self.cache[i]
+            self.cache.move_to_end(i)
+            while len(self.cache) > 2 * (self.workers + 1):
+                self.cache.popitem(last=False)
+        return future
+
+    def _load(self, i):
+        _, _, comp_offset, comp_size = self.blocks[i]
+        return self.decompress(os.pread(self.fd, comp_size, comp_offset))
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.cache.clear()
+
+
+class _Section(io.RawIOBase):
+    """Read-only file over `size` bytes from `offset` read by `pread(n, offset)`, i.e. the data of a member"""
+    def __init__(self, pread, offset, size, name=None):
+        super().__init__()
+        self.pread = pread
+        self.offset = offset
+        self.size = size
+        self.name = name
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self.size - self.pos)
+        if n <= 0:
+            return 0
+        data = self.pread(n, self.offset + self.pos)
+        b[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            pos += self.pos
+        elif whence == io.SEEK_END:
+            pos += self.size
+        self.pos = max(pos, 0)
+        return self.pos
+
+    def tell(self):
+        return self.pos
 
 
 class TarWrite:
-    def __init__(self, tar_path: Path, mode='w', keep=False):
+    """
+    compression: 'gz', 'xz' or 'zst' (with zstandard installed) to compress in blocks on `workers` threads,
+        at `level` (6, 6 and 3 if None), while the archive stays readable by tar and the stdlib as usual
+        (but .tar.zst by the stdlib only from Python 3.14 on)
+    background: members are queued, up to `queue_size` (blocking beyond), and written by a dedicated thread,
+        so that the producer does not wait for the archive. Errors of the writer are raised by the next
+        member queued or on __exit__. Objects are serialized by add_object() before being queued.
+    dedup: a regular member whose content (sha256) is already in the archive is stored as a hard link to it,
+        resolved by TarRead as well as by tar and the stdlib. See `dedup_stats`.
+    """
+    def __init__(self, tar_path: Path, mode='w', keep=False, compression=None, workers=None, level=None,
+                 background=False, queue_size=64, dedup=False):
         assert mode in ['w', 'a']
+        if compression and mode == 'a':
+            raise ValueError('Cannot append to a compressed archive')
         self.tar_path = tar_path
         self.mode = mode
         self.keep = keep
+        self.compression = _codec(compression) if compression else None
+        self.workers = workers
+        self.level = level
+        self.background = background
+        self.queue_size = queue_size
         self.tar_file: None | _tarfile.TarFile = None
+        self._stream: None | _BlockWriter = None
+        self._queue: None | Queue = None
+        self._writer: None | threading.Thread = None
+        self._error: None | BaseException = None
+        self.dedup = dedup
+        self.dedup_stats = None  # dict(members=, refs=, bytes_saved=) of this session if dedup
         self._mem_paths = []  # list[Path]
+        self._index: None | TarIndex = None
 
     def extend(self, mem_paths: Iterable[Path]):
         for path in mem_paths:
             self.append(path)
 
     def append(self, mem_path: Path):
-        self.tar_file.add(mem_path, arcname=mem_path.name)
+        self._put(self._append, mem_path)
+
+    def _append(self, mem_path: Path):
+        if self.dedup and (info := self.tar_file.gettarinfo(mem_path, arcname=mem_path.name)).isreg():
+            self._addfile(info, open(mem_path, 'rb'))
+        else:
+            start = self.tar_file.offset
+            self.tar_file.add(mem_path, arcname=mem_path.name)
+            self._index_new(start)
         self._mem_paths.append(mem_path)
 
+    def add_bytes(self, mem_name: str, data: bytes):
+        """Add `data` as a member, without any file on disk"""
+        info = _new_tarinfo(mem_name, len(data))
+        self._put(self._addfile, info, io.BytesIO(data))
+
+    def add_object(self, mem_name: str, obj, serializer=pickle):
+        """Add `obj` serialized by `serializer.dumps`, e.g. pickle (default) or json (with text encoded)"""
+        data = serializer.dumps(obj)
+        self.add_bytes(mem_name, data.encode() if isinstance(data, str) else data)
+
+    @contextmanager
+    def open_member(self, mem_name: str, spool_size=64 * 2**20):
+        """
+        Binary file to write a member into, added on exit:
+            with tf.open_member('result.pkl') as file:
+                pickle.dump(obj, file)
+        Held in memory up to `spool_size` bytes, and spilled to a temporary file only beyond that.
+        """
+        file = SpooledTemporaryFile(max_size=spool_size)
+        try:
+            yield file
+            size = file.seek(0, io.SEEK_END)
+            file.seek(0)
+        except BaseException:
+            file.close()
+            raise
+        self._put(self._addfile, _new_tarinfo(mem_name, size), file)
+
+    def _addfile(self, info, fileobj):
+        """`fileobj` is closed once added"""
+        with fileobj:
+            if self.dedup:
+                info, fileobj = self._dedup(info, fileobj)
+            start = self.tar_file.offset
+            self.tar_file.addfile(info, fileobj)
+            self._index_new(start)
+
+    def _dedup(self, info, fileobj):
+        """(info, fileobj) to add instead, a hard link to the same content if any"""
+        digest = _sha256(fileobj)
+        fileobj.seek(0)
+        digests, stats = self._index.digests, self.dedup_stats
+        if info.name in self._index.lookup:  # Links to it would now resolve to this one
+            for key in [key for key, name in digests.items() if name == info.name]:
+                del digests[key]
+        stats['members'] += 1
+        if (target := digests.get(digest)) is None:
+            digests[digest] = info.name
+            return info, fileobj
+        stats['refs'] += 1
+        stats['bytes_saved'] += info.size
+        link = _new_tarinfo(info.name, 0)
+        link.type, link.linkname, link.mtime = _tarfile.LNKTYPE, target, info.mtime
+        return link, None
+
+    def _put(self, func, *args):
+        """func(*args) now, or by the writer thread if background"""
+        if self._queue is None:
+            return func(*args)
+        if self._error is not None:
+            _close_args(args)
+            raise self._error
+        self._queue.put((func, args))  # Blocks while full
+
+    def _drain(self):
+        while (item := self._queue.get()) is not None:
+            func, args = item
+            if self._error is not None:  # Discarded, but still taken not to block the producer
+                _close_args(args)
+                continue
+            try:
+                func(*args)
+            except BaseException as e:
+                self._error = e
+
+    def _stop(self):
+        self._queue.put(None)
+        self._writer.join()
+        self._queue = self._writer = None
+
+    def _index_new(self, start):
+        """Index the members added from offset `start`, as TarFile.addfile() does not record where they lie"""
+        tf = self.tar_file
+        for info in tf.members[len(self._index.members):]:
+            offset_data = start + len(info.tobuf(tf.format, tf.encoding, tf.errors))
+            self._index.append(info, offset_data)
+            start = offset_data + (-(-info.size // _tarfile.BLOCKSIZE) * _tarfile.BLOCKSIZE if info.isreg() else 0)
+
     def _unlink(self):
+        if self._mem_paths:  # Only once the archive is surely on disk
+            _fsync(self.tar_path)
         for path in self._mem_paths:
             path.unlink()
         self._mem_paths.clear()
@@ -38,13 +552,51 @@ class TarWrite:
     def _close(self):
         self.tar_file.close()
         self.tar_file = None
+        index, self._index = self._index, None
+        if self._stream is not None:
+            self._stream.close()
+            index.blocks, index.codec = self._stream.blocks, self.compression
+            self._stream = None
+        index.save(self.tar_path)
 
     def __enter__(self):
-        self.tar_file = _tarfile.open(self.tar_path, mode=self.mode)
+        digests = self._digests() if self.dedup else None
+        if self.compression:
+            self._stream = _BlockWriter(open(self.tar_path, 'wb'), self.compression, self.workers, self.level)
+            self.tar_file = _tarfile.open(fileobj=self._stream, mode='w')
+        else:
+            self.tar_file = _tarfile.open(self.tar_path, mode=self.mode)
+        self._index = TarIndex.from_tarinfos(self.tar_file.members)  # Already in the archive if mode='a'
+        self._index.digests = digests
+        self.dedup_stats = dict(members=0, refs=0, bytes_saved=0) if self.dedup else None
+        self._error = None
+        if self.background:
+            self._queue = Queue(maxsize=self.queue_size)
+            self._writer = threading.Thread(target=self._drain, name=f'TarWrite({self.tar_path.name})', daemon=True)
+            self._writer.start()
         return self
 
+    def _digests(self):
+        """Of the members already in the archive to append to, from its index or else by reading them"""
+        if self.mode == 'w' or not self.tar_path.exists():
+            return {}
+        if (index := TarIndex.load(self.tar_path)) is not None and index.digests is not None:
+            return index.digests
+        digests = {}
+        with TarRead(self.tar_path) as tf:
+            for name, offset, _ in tf.index.members:
+                if offset is not None and name not in tf.index.refs:
+                    with tf._open(name) as file:
+                        digests[_sha256(file)] = name  # Read as resolved by name, i.e. the last one
+        return digests
+
     def __exit__(self, typ, value, trace_back):
+        if self._writer is not None:
+            self._stop()
         self._close()
+        error, self._error = self._error, None
+        if error is not None and typ is None:  # Otherwise already raised to the producer, or superseded
+            raise error
         if (typ is None) and (value is None) and (trace_back is None):
             if not self.keep:
                 self._unlink()
@@ -52,21 +604,102 @@ class TarWrite:
                 self._mem_paths.clear()
 
 
+def _close_args(args):
+    """Close the files among `args` of an item never added, e.g. the temporary file of open_member()"""
+    for arg in args:
+        if callable(getattr(arg, 'close', None)):
+            arg.close()
+
+
 class TarRead:
-    def __init__(self, tar_path, mode='r'):
-        self.tar_path = tar_path
+    """
+    Members are read directly at the offsets recorded in the sidecar TarIndex, `<tar>.idx`.
+    If it is missing or stale, the archive is scanned once, and the index is rewritten:
+    for a .tar.gz/.xz/.zst, its blocks are recovered first (see _scan_blocks()) and its headers read through them.
+
+    view=True: .get() and thus iteration/indexing give .get_buffer() instead of files
+    workers: threads decompressing an archive compressed by TarWrite, os.cpu_count() if None
+    """
+    def __init__(self, tar_path, mode='r', view=False, workers=None):
+        self.tar_path = Path(tar_path)
         self.mode = mode
+        self.view = view
+        self.workers = workers
         self.tar_file: None | _tarfile.TarFile = None
+        self.index: None | TarIndex = None
+        self._fd = None
+        self._pread = None
+        self._blocks: None | _BlockReader = None
+        self._mmap = None
         self._mem_files = []
+        self._views = []
+
+    def get_buffer(self, mem_name: str):  # -> memoryview
+        """
+        Data of a member as a read-only memoryview into the archive mapped in memory, without copying,
+        e.g. pickle.loads(tf.get_buffer(name)) or np.frombuffer(tf.get_buffer(name), dtype=...).
+        Processes reading the same archive share its pages in the page cache.
+        The views are released on __exit__, so copy what must outlive it.
+        If the archive was compressed by TarWrite, this is a view of a decompressed copy instead.
+        """
+        view = self._buffer(mem_name)
+        self._views.append(view)
+        return view
 
     def get(self, mem_name: str):  # -> File
-        member = self.tar_file.getmember(mem_name)
-        f = self.tar_file.extractfile(member)
-        self._mem_files.append(f)
+        f = self._open(mem_name)
+        (self._views if self.view else self._mem_files).append(f)
         return f
 
     def __iter__(self):  # -> Iterator[File]
-        return (self.get(member) for member in self.tar_file.getnames())
+        return (self.get(name) for name in self.mem_names)
+
+    def iter_close(self):  # -> Iterator[File]
+        """As __iter__, but each file is closed (or view released) as soon as the next one is asked for,
+        instead of all of them on __exit__. Members that are not files, e.g. directories, are skipped."""
+        for name in self.mem_names:
+            if (f := self._open(name)) is None:
+                continue
+            try:
+                yield f
+            finally:
+                _release(f)
+
+    def map(self, func=None, workers=None, chunksize=16):  # -> Iterator
+        """
+        func(file) for every member, in order, computed in a pool of `workers` processes (os.cpu_count() if None),
+        each of which opens the archive by itself and reads the members by offset, e.g.
+            for result in tf.map(pickle.load): ...
+        func must be picklable, i.e. defined at the top level of a module, and receives a view if view=True.
+        By default, pickle.load, or pickle.loads if view=True.
+        Stopping early, e.g. by break, cancels what is not started yet.
+        """
+        if func is None:
+            func = pickle.loads if self.view else pickle.load
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self.tar_path, self.view))
+        try:
+            yield from executor.map(partial(_map_member, func), self.mem_names, chunksize=chunksize)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _open(self, mem_name: str):  # -> File, left to the caller to close
+        if self.view:
+            return self._buffer(mem_name)
+        offset, size = self.index.lookup[mem_name]
+        if offset is None:  # Not a regular file
+            return self._tar().extractfile(mem_name)
+        return io.BufferedReader(_Section(self._pread, offset, size, name=mem_name))
+
+    def _buffer(self, mem_name: str):  # -> memoryview, left to the caller to release
+        offset, size = self.index.lookup[mem_name]
+        if offset is None:
+            raise ValueError(f'{mem_name} cannot be viewed: Not a regular file, or the archive is compressed')
+        if self._blocks is not None:
+            return memoryview(self._blocks.pread(size, offset))
+        if self._mmap is None:
+            self._mmap = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+            self._views.append(memoryview(self._mmap))
+        return self._views[0][offset:offset+size]
 
     def __getitem__(self, item):  # -> File or list[File]
         if isinstance(item, slice):
@@ -76,21 +709,67 @@ class TarRead:
 
     @cached_property
     def mem_names(self):  # list[str]
-        return self.tar_file.getnames()
+        return [name for name, _, _ in self.index.members]
 
-    @property
+    @cached_property
     def mem_paths(self):
         return [self.tar_path.parent / name for name in self.mem_names]
 
+    def _tar(self):
+        if self.tar_file is None and self._blocks is not None:  # Through the blocks, e.g. of a .tar.zst
+            stream = io.BufferedReader(_Section(self._blocks.pread, 0, self._blocks.size, name=str(self.tar_path)))
+            self.tar_file = _tarfile.open(fileobj=stream, mode='r:')
+        elif self.tar_file is None:
+            self.tar_file = _tarfile.open(self.tar_path, mode=self.mode)
+        return self.tar_file
+
+    def _reindex(self):
+        if (codec := _codec_of(self._fd)) is None or (blocks := _scan_blocks(self._fd, codec)) is None:
+            return TarIndex.from_tarinfos(self._tar().getmembers(), direct=not _compressed(self.tar_path))
+        self._blocks = _BlockReader(self._fd, blocks, codec, self.workers)
+        index = TarIndex.from_tarinfos(self._tar().getmembers())
+        index.blocks, index.codec = blocks, codec
+        return index
+
     def _close(self):
-        self.tar_file.close()
-        self.tar_file = None
+        if self.tar_file is not None:
+            self.tar_file.close()
+            self.tar_file = None
         for file in self._mem_files:
             file.close()
         self._mem_files.clear()
+        self._release_views()
+        if self._blocks is not None:
+            self._blocks.close()
+            self._blocks = None
+        os.close(self._fd)
+        self._fd = None
+        self._pread = None
+
+    def _release_views(self):
+        try:
+            for view in self._views[::-1]:  # The whole-archive view last
+                view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:  # Still exported, e.g. to np.frombuffer; left to the garbage collector
+            pass
+        self._views.clear()
+        self._mmap = None
 
     def __enter__(self):
-        self.tar_file = _tarfile.open(self.tar_path, mode=self.mode)
+        self._fd = os.open(self.tar_path, os.O_RDONLY)
+        if (index := TarIndex.load(self.tar_path)) is None:
+            try:
+                index = self._reindex()
+            except BaseException:
+                self._close()
+                raise
+            index.save(self.tar_path)
+        elif index.blocks is not None:
+            self._blocks = _BlockReader(self._fd, index.blocks, index.codec, self.workers)
+        self.index = index
+        self._pread = partial(os.pread, self._fd) if self._blocks is None else self._blocks.pread
         _ = self.mem_names
         return self
 
@@ -98,6 +777,223 @@ class TarRead:
         self._close()
 
 
+def _release(f):
+    if f is None:  # Not a file, e.g. a directory
+        return
+    if isinstance(f, memoryview):
+        try:
+            f.release()
+        except BufferError:  # Still exported; left to the garbage collector
+            pass
+    else:
+        f.close()
+
+
+_worker_tar: None | TarRead = None  # Of each process of TarRead.map()
+
+
+def _init_worker(tar_path, view):
+    global _worker_tar
+    _worker_tar = TarRead(tar_path, view=view, workers=1).__enter__()
+
+
+def _map_member(func, mem_name):
+    f = _worker_tar._open(mem_name)
+    try:
+        return func(f)
+    finally:
+        _release(f)
+
+
+class Manifest:
+    """
+    `Name.tar.manifest.json` of a sharded archive `Name.tar`, written by ShardWrite after each shard
+
+    shards: file names of the shards, in the same directory
+    members: [[name, shard, offset, size], ...] in order, shard being the position in `shards`
+    """
+    def __init__(self, shards=None, members=None):
+        self.shards = shards or []
+        self.members = members or []
+
+    @staticmethod
+    def path_of(tar_path: Path):
+        return tar_path.with_name(tar_path.name + '.manifest.json')
+
+    @staticmethod
+    def shard_name(tar_path: Path, i):
+        stem = _shard_stem(tar_path)
+        return f'{stem}.{i:03d}{tar_path.name[len(stem):]}'
+
+    @classmethod
+    def load(cls, tar_path: Path):
+        """Empty if missing"""
+        try:
+            with open(cls.path_of(tar_path), 'r') as file:
+                dct = json.load(file)
+        except FileNotFoundError:
+            return cls()
+        return cls(dct['shards'], dct['members'])
+
+    def save(self, tar_path: Path):
+        path = self.path_of(tar_path)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}')
+        with open(tmp_path, 'w') as file:
+            json.dump(dict(shards=self.shards, members=self.members), file)
+        os.replace(tmp_path, path)
+
+
+def _shard_stem(tar_path: Path):
+    """'Name' of 'Name.tar' or 'Name.tar.gz'"""
+    name = tar_path.name
+    return name[:i] if (i := name.find('.tar')) > 0 else name
+
+
+class ShardWrite:
+    """
+    TarWrite over the shards of an archive, see shards().
+    Each shard is a complete tar with its own TarIndex, closed (and its sources unlinked unless `keep`)
+    when the next one starts, and the manifest is rewritten each time.
+    """
+    def __init__(self, tar_path: Path, mode='w', keep=False, max_size=2**30, max_members=None, **kwargs):
+        assert mode in ['w', 'a']
+        self.tar_path = tar_path
+        self.mode = mode
+        self.keep = keep
+        self.max_size = max_size
+        self.max_members = max_members
+        self.kwargs = kwargs
+        self.manifest: None | Manifest = None
+        self._shard: None | TarWrite = None
+        self._size = 0
+        self._count = 0
+
+    def extend(self, mem_paths: Iterable[Path]):
+        for path in mem_paths:
+            self.append(path)
+
+    def append(self, mem_path: Path):
+        self._current().append(mem_path)
+        self._added(os.stat(mem_path).st_size)
+
+    def add_bytes(self, mem_name: str, data: bytes):
+        self._current().add_bytes(mem_name, data)
+        self._added(len(data))
+
+    def add_object(self, mem_name: str, obj, serializer=pickle):
+        data = serializer.dumps(obj)
+        self.add_bytes(mem_name, data.encode() if isinstance(data, str) else data)
+
+    @contextmanager
+    def open_member(self, mem_name: str, spool_size=64 * 2**20):
+        with self._current().open_member(mem_name, spool_size=spool_size) as file:
+            yield file
+            size = file.seek(0, io.SEEK_END)
+        self._added(size)
+
+    @property
+    def shard_paths(self):
+        return [self.tar_path.with_name(name) for name in self.manifest.shards]
+
+    def _current(self):
+        if self._shard is None:
+            name = Manifest.shard_name(self.tar_path, len(self.manifest.shards))
+            self._shard = TarWrite(self.tar_path.with_name(name), mode='w', keep=self.keep, **self.kwargs)
+            self._shard.__enter__()
+            self.manifest.shards.append(name)
+        return self._shard
+
+    def _added(self, size):
+        self._size += _tarfile.BLOCKSIZE + size  # Header and data, roughly
+        self._count += 1
+        if self._size >= self.max_size or (self.max_members is not None and self._count >= self.max_members):
+            self._close_shard()
+
+    def _close_shard(self, *exc_info):
+        shard, self._shard = self._shard, None
+        self._size = self._count = 0
+        index = shard._index
+        try:
+            shard.__exit__(*(exc_info or (None, None, None)))
+        finally:
+            i = len(self.manifest.shards) - 1
+            self.manifest.members.extend([name, i, offset, size] for name, offset, size in index.members)
+            self.manifest.save(self.tar_path)
+
+    def __enter__(self):
+        self.manifest = Manifest.load(self.tar_path)
+        if self.mode == 'w':
+            for path in self.shard_paths:
+                path.unlink(missing_ok=True)
+                TarIndex.path_of(path).unlink(missing_ok=True)
+            self.manifest = Manifest()
+        return self
+
+    def __exit__(self, typ, value, trace_back):
+        if self._shard is not None:
+            self._close_shard(typ, value, trace_back)
+
+
+class ShardRead:
+    """
+    TarRead over all the shards of an archive, see shards(), each opened on first access.
+    Shards are complete tars by themselves: `shard_paths` can be read independently by TarRead, e.g. one per process.
+    """
+    def __init__(self, tar_path, view=False, workers=None):
+        self.tar_path = Path(tar_path)
+        self.view = view
+        self.workers = workers
+        self.manifest: None | Manifest = None
+        self.lookup = {}  # name: shard, the last one wins
+        self._shards = {}  # shard: TarRead
+
+    def get(self, mem_name: str):  # -> File
+        return self._open(self.lookup[mem_name]).get(mem_name)
+
+    def get_buffer(self, mem_name: str):  # -> memoryview
+        return self._open(self.lookup[mem_name]).get_buffer(mem_name)
+
+    def __iter__(self):  # -> Iterator[File]
+        return (self.get(name) for name in self.mem_names)
+
+    def __getitem__(self, item):  # -> File or list[File]
+        if isinstance(item, slice):
+            return [self.get(name) for name in self.mem_names[item]]
+        else:
+            return self.get(self.mem_names[item])
+
+    @cached_property
+    def mem_names(self):  # list[str]
+        return [name for name, _, _, _ in self.manifest.members]
+
+    @cached_property
+    def mem_paths(self):
+        return [self.tar_path.parent / name for name in self.mem_names]
+
+    @property
+    def shard_paths(self):
+        return [self.tar_path.with_name(name) for name in self.manifest.shards]
+
+    def _open(self, shard):
+        if (tf := self._shards.get(shard)) is None:
+            path = self.tar_path.with_name(self.manifest.shards[shard])
+            tf = self._shards[shard] = TarRead(path, view=self.view, workers=self.workers).__enter__()
+        return tf
+
+    def __enter__(self):
+        self.manifest = Manifest.load(self.tar_path)
+        if not self.manifest.shards:
+            raise FileNotFoundError(f'No shards of {self.tar_path}: {Manifest.path_of(self.tar_path)} is missing')
+        self.lookup = {name: shard for name, shard, _, _ in self.manifest.members}
+        _ = self.mem_names
+        return self
+
+    def __exit__(self, typ, value, trace_back):
+        for tf in self._shards.values():
+            tf.__exit__(typ, value, trace_back)
+        self._shards.clear()
+
+
 if __name__ == '__main__':
     import pickle
     import wjkim as wj
@@ -110,6 +1006,11 @@ if __name__ == '__main__':
             
             2.a. keep=False: individual files will be lost (default)
             2.b. keep=True : individual files will be kept
+        3. Or add objects directly from memory, without individual files
+        4. mode='w:gz' (or 'w:xz', 'w:zst'): Compressed in parallel, still read as usual
+        5. background=True: Written by another thread, while the producer goes on
+        6. shards(): Split over shards of bounded size, each mode='a' starting a new one
+        7. dedup=True: Identical contents stored once, the others as hard links to it
     """
     # 1. Make individual files
     for n in range(10):
@@ -133,6 +1034,30 @@ if __name__ == '__main__':
         paths = [wj.s(f'$rsrc/test_{n}.pkl') for n in range(10)]
         tf.extend(paths)
 
+    # 3. Or skip individual files altogether, adding objects directly from memory
+    with tar('$rsrc/Test_charlie.tar', 'w') as tf:
+        for n in range(10):
+            tf.add_object(f'test_{n}.pkl', list(range(n)))
+        tf.add_bytes('raw.bin', bytes(range(10)))
+        with tf.open_member('test_10.pkl') as file:
+            pickle.dump(list(range(10)), file)
+
+    # 4. Compressed in blocks on all cores
+    with tar('$rsrc/Test_delta.tar.gz', 'w:gz') as tf:
+        for n in range(10):
+            tf.add_object(f'test_{n}.pkl', list(range(n)))
+
+    # 5. Written in the background, the loop going on meanwhile
+    with tar('$rsrc/Test_echo.tar', 'w', background=True) as tf:
+        for n in range(10):
+            tf.add_object(f'test_{n}.pkl', list(range(n)))
+
+    # 6. Shards of 4 members at most
+    for _ in range(3):
+        with shards('$rsrc/Test_foxtrot.tar', 'a', max_members=4) as tf:
+            for n in range(5):
+                tf.add_object(f'test_{n}.pkl', list(range(n)))
+
     """
     Reading
         a. tf.__iter__()       :  Iterate over all files
@@ -141,6 +1066,9 @@ if __name__ == '__main__':
         
         d. tf.mem_names        :  List of all file names
         e. tf.mem_paths        :  List of all file paths
+
+        f. tf.iter_close()     :  Iterate over all files, closing each one after use
+        g. tf.map(func)        :  func(file) for all files, in parallel processes
     """
     with tar('$rsrc/Test_alpha.tar', 'r') as tf:
         for file in tf:
@@ -156,3 +1084,12 @@ if __name__ == '__main__':
         print(tf.mem_names)
         print(tf.mem_paths)
         print(pickle.load(tf.get('test_3.pkl')))
+        print([pickle.load(file) for file in tf.iter_close()])
+        print(list(tf.map(pickle.load, workers=2)))
+
+    with tar('$rsrc/Test_delta.tar.gz', 'r') as tf:
+        print([pickle.load(file) for file in tf])
+
+    with shards('$rsrc/Test_foxtrot.tar', 'r') as tf:
+        print(tf.shard_paths)
+        print([pickle.load(file) for file in tf])